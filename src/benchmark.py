@@ -0,0 +1,227 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import sys
+from datetime import datetime
+import clingo
+from modules.solver import Solver
+from modules.portfolio import Portfolio
+
+############################## VARIABILI GLOBALI #################################
+
+# Cartella con i dataset di benchmark (lp-dataset-N) e con i risultati
+benchmark_dir = "benchmark/"
+path_risultati = benchmark_dir + "results/benchmark.json"
+path_baseline = benchmark_dir + "results/baseline.json"
+
+# Metriche confrontate con la baseline: le prime devono coincidere, le seconde sono tempi
+METRICHE_ESATTE = ["stato", "atomi", "regole"]
+METRICHE_TEMPO = ["tempo_grounding", "tempo_risoluzione", "tempo_primo_modello", "tempo_ottimo"]
+
+# Differenza minima in secondi perché un tempo sia considerato una regressione (rumore di misura)
+TEMPO_MINIMO = 0.1
+
+###################################### FUNZIONI PRINCIPALI ######################################
+
+def datasets(selezionati=None):
+    """
+    Restituisce le cartelle dei dataset di benchmark, ordinate per numero.
+
+    :param selezionati: Numeri dei dataset da considerare (es. [1, 2]). Default: tutti.
+    :type selezionati: list
+    :return: Dizionario numero del dataset -> cartella.
+    :rtype: dict
+    """
+    cartelle = dict()
+    for cartella in glob.glob(os.path.join(benchmark_dir, "lp-dataset-*")):
+        numero = int(re.search(r"(\d+)$", cartella).group(1))
+        if not selezionati or numero in selezionati:
+            cartelle[numero] = cartella
+    return dict(sorted(cartelle.items()))
+
+def programmi(cartella):
+    """
+    Legge i file `.lp` di un dataset.
+
+    :param cartella: Cartella con i file `.lp` del dataset.
+    :type cartella: str
+    :return: Dizionario nome del file (senza estensione) -> testo, come `DatasetManager.programmi`.
+    :rtype: dict
+    """
+    testi = dict()
+    for path in sorted(glob.glob(os.path.join(cartella, "*.lp"))):
+        with open(path) as f:
+            testi[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return testi
+
+def esegui(cartella, threads, seed, models, time_limit):
+    """
+    Risolve un dataset con `main.lp` e raccoglie le metriche della risoluzione.
+
+    :param cartella: Cartella con i file `.lp` del dataset.
+    :type cartella: str
+    :param threads: Numero di thread di clingo.
+    :type threads: int
+    :param seed: Seed del generatore casuale di clingo (--seed).
+    :type seed: int
+    :param models: Numero massimo di modelli da calcolare (0 per tutti).
+    :type models: int
+    :param time_limit: Limite di tempo in secondi.
+    :type time_limit: int
+    :return: Dizionario con le metriche della risoluzione.
+    :rtype: dict
+    """
+    solver = Solver(models=models, threads=threads, time_limit=time_limit, options=[f"--seed={seed}"])
+    risultato = solver.aggiungi_fatti(programmi(cartella)).risolvi()
+
+    statistiche = risultato.statistiche
+    return {
+        "stato": risultato.stato,
+        "costo": risultato.costo,
+        "modelli": risultato.modelli,
+        "atomi": int(statistiche["problem"]["lp"]["atoms"]),
+        "regole": int(statistiche["problem"]["lp"]["rules"]),
+        "tempo_grounding": risultato.tempo_grounding,
+        "tempo_risoluzione": risultato.tempo_risoluzione,
+        "tempo_primo_modello": risultato.tempo_primo_modello,
+        # L'ultimo modello è l'ottimo solo se l'ottimalità è stata dimostrata
+        "tempo_ottimo": risultato.tempo_ultimo_modello if risultato.stato == "OPTIMUM FOUND" else None,
+        "conflitti": int(statistiche["solving"]["solvers"]["conflicts"]),
+        "scelte": int(statistiche["solving"]["solvers"]["choices"])
+    }
+
+def confronta(esecuzioni, baseline, tolleranza):
+    """
+    Confronta le esecuzioni con quelle della baseline aventi stesso dataset, thread e seed.
+
+    È considerata una regressione: un cambio di stato o della dimensione del grounding,
+    un costo peggiore (confronto lessicografico, costi più bassi sono migliori) oppure un tempo
+    maggiore di oltre `tolleranza` volte quello della baseline (e di almeno `TEMPO_MINIMO` secondi).
+
+    :param esecuzioni: Esecuzioni correnti.
+    :type esecuzioni: list
+    :param baseline: Esecuzioni della baseline.
+    :type baseline: list
+    :param tolleranza: Aumento relativo dei tempi tollerato (es. 0.2 per il 20%).
+    :type tolleranza: float
+    :return: Lista delle differenze trovate, come stringhe.
+    :rtype: list
+    """
+    chiave = lambda e: (e["dataset"], e["threads"], e["seed"])
+    riferimenti = {chiave(e): e for e in baseline}
+    differenze = list()
+
+    for esecuzione in esecuzioni:
+        riferimento = riferimenti.get(chiave(esecuzione))
+        nome = "dataset {} (threads={}, seed={})".format(*chiave(esecuzione))
+        if riferimento is None:
+            print(f"Attenzione: {nome} non è presente nella baseline.")
+            continue
+
+        for metrica in METRICHE_ESATTE:
+            if esecuzione[metrica] != riferimento[metrica]:
+                differenze.append(f"{nome}: {metrica} {riferimento[metrica]} -> {esecuzione[metrica]}")
+
+        if esecuzione["costo"] and riferimento["costo"] and esecuzione["costo"] > riferimento["costo"]:
+            differenze.append(f"{nome}: costo {riferimento['costo']} -> {esecuzione['costo']}")
+
+        for metrica in METRICHE_TEMPO:
+            prima, dopo = riferimento[metrica], esecuzione[metrica]
+            if prima is not None and (dopo is None or (dopo > prima * (1 + tolleranza) and dopo - prima > TEMPO_MINIMO)):
+                dopo = "n/d" if dopo is None else f"{dopo:.3f}s"
+                differenze.append(f"{nome}: {metrica} {prima:.3f}s -> {dopo}")
+
+    return differenze
+
+def stampa(esecuzioni):
+    """
+    Stampa una tabella riassuntiva delle esecuzioni.
+    """
+    print(f"{'DS':>3} {'Thr':>4} {'Seed':>5} {'Stato':<14} {'Atomi':>7} {'Regole':>7} {'Ground':>8} {'Solve':>8} "
+          f"{'1° mod.':>8} {'Ottimo':>8} {'Conflitti':>10}  Costo")
+    formatta = lambda t: "-" if t is None else f"{t:.3f}"
+    for e in esecuzioni:
+        print(f"{e['dataset']:>3} {e['threads']:>4} {e['seed']:>5} {e['stato']:<14} {e['atomi']:>7} {e['regole']:>7} "
+              f"{formatta(e['tempo_grounding']):>8} {formatta(e['tempo_risoluzione']):>8} "
+              f"{formatta(e['tempo_primo_modello']):>8} {formatta(e['tempo_ottimo']):>8} {e['conflitti']:>10}  {e['costo']}")
+
+def main():
+    """
+    Esegue il benchmark di `main.lp` sui dataset `benchmark/lp-dataset-N`, salva i risultati in
+    formato JSON e li confronta con la baseline, se presente.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark dell'encoding sui dataset in benchmark/lp-dataset-N")
+    parser.add_argument("-d", "--datasets", type=int, nargs="+", default=None, help="Numeri dei dataset da eseguire (default: tutti)")
+    parser.add_argument("-p", "--threads", type=int, nargs="+", default=[1], help="Numeri di thread da provare (default: 1)")
+    parser.add_argument("-s", "--seeds", type=int, nargs="+", default=[0], help="Seed di clingo da provare (default: 0)")
+    parser.add_argument("-m", "--models", type=int, default=0, help="Numero di modelli da calcolare, 0 per tutti (default: 0)")
+    parser.add_argument("-t", "--time-limit", type=int, default=60, help="Limite di tempo in secondi per esecuzione (default: 60)")
+    parser.add_argument("-o", "--output", default=path_risultati, help=f"File JSON dei risultati (default: {path_risultati})")
+    parser.add_argument("-b", "--baseline", default=path_baseline, help=f"File JSON della baseline (default: {path_baseline})")
+    parser.add_argument("--save-baseline", action="store_true", help="Salva i risultati anche come nuova baseline")
+    parser.add_argument("--portfolio", nargs="*", default=None, metavar="CONFIGURAZIONE",
+                        help="Confronta le configurazioni di clingo su ogni dataset e ne salva il profilo migliore")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Aumento relativo dei tempi tollerato (default: 0.2)")
+    args = parser.parse_args()
+
+    cartelle = datasets(args.datasets)
+    if not cartelle:
+        print("Errore: nessun dataset di benchmark trovato.")
+        exit(1)
+
+    if args.portfolio is not None:
+        portfolio = Portfolio(configurazioni=args.portfolio or None, time_limit=args.time_limit)
+        for numero, cartella in cartelle.items():
+            print(f"Portfolio sul dataset {numero}...")
+            Portfolio.stampa(portfolio.esegui(programmi(cartella)))
+            print()
+        return
+
+    esecuzioni = list()
+    for numero, cartella in cartelle.items():
+        for threads in args.threads:
+            for seed in args.seeds:
+                print(f"Dataset {numero} (threads={threads}, seed={seed})...")
+                esecuzione = {"dataset": numero, "threads": threads, "seed": seed}
+                esecuzione.update(esegui(cartella, threads, seed, args.models, args.time_limit))
+                esecuzioni.append(esecuzione)
+
+    print()
+    stampa(esecuzioni)
+
+    risultati = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "clingo": clingo.__version__,
+        "python": platform.python_version(),
+        "cpu": os.cpu_count(),
+        "models": args.models,
+        "time_limit": args.time_limit,
+        "esecuzioni": esecuzioni
+    }
+    percorsi = [args.output] + ([args.baseline] if args.save_baseline else [])
+    for percorso in percorsi:
+        os.makedirs(os.path.dirname(percorso) or ".", exist_ok=True)
+        with open(percorso, "w") as f:
+            json.dump(risultati, f, indent=4)
+        print(f"Risultati salvati in: {percorso}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    differenze = confronta(esecuzioni, baseline["esecuzioni"], args.tolerance)
+
+    print()
+    if differenze:
+        print(f"Regressioni rispetto a {args.baseline}:")
+        for differenza in differenze:
+            print(f"- {differenza}")
+        sys.exit(1)
+    print(f"Nessuna regressione rispetto a {args.baseline}.")
+
+if __name__ == "__main__":
+    main()
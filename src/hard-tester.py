@@ -1,9 +1,12 @@
 import pandas as pd
 import os
-from modules.dataset_manager import DatasetManager
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from modules.course_parser import CourseParser
+from modules.course_selector import CourseSelector
 from modules.dataset_loader import DatasetLoader
-import subprocess
+from modules.solver import Solver, SolverIncrementale, SolverDiagnosi
+from modules.result_cache import ResultCache
+from main import filtra_corsi, genera
 
 ############################## VARIABILI GLOBALI #################################
 
@@ -23,10 +26,17 @@ NUMERO_MINIMO_DI_INSEGNAMENTI = 9
 ###################################### FUNZIONI PRINCIPALI ######################################
 
 def write(filters_corsi):
-    # esegue il main mettendo come arg il valore di filters_corsi preceduti da --
+    """
+    Genera in memoria i programmi ASP per i corsi indicati, come farebbe `main.py <codice> ...`.
+
+    @param filters_corsi: Dizionario con la lista dei codici dei corsi in "Cod. Corso di Studio".
+    @type filters_corsi: dict
+    @return: Dizionario nome del file -> testo del programma ASP generato.
+    @rtype: dict
+    """
     print("Writing...")
     courses = filters_corsi["Cod. Corso di Studio"]
-    os.system("python3 main.py --" + " --".join(courses))
+    return genera(filtra_corsi(courses), output_dir=None)
 
 
 def init_matricole(filename):
@@ -87,44 +97,125 @@ def init_corsi_matricole(filepathCorsi, filepathProf):
     print("Estrazione completata. Rieseguire il programma.")
     exit()
 
-def run():
+def esito(risultato):
+    """
+    Converte il risultato del solver nel codice di esito usato dai test.
+
+    @param risultato: Risultato restituito dal solver.
+    @type risultato: RisultatoSolver
+    @return: -1 se il problema è "UNSATISFIABLE", 1 se è stato trovato l'ottimo ("OPTIMUM FOUND"), 0 per altri casi.
+    @rtype: int
+    """
+    print(risultato.stato)
+
+    if risultato.stato == "UNSATISFIABLE":
+        return -1
+    elif risultato.stato == "OPTIMUM FOUND":
+        return 1
+    return 0
+
+def run(programmi):
     """
-    Esegue un processo esterno (script bash) e analizza l'output.
+    Risolve in-process i programmi generati da `write` e ne analizza l'esito.
 
-    @return: -1 se l'output contiene "UNSATISFIABLE", 1 se contiene "OPTIMUM FOUND", 0 per altri casi.
+    @param programmi: Programmi ASP generati da `write`.
+    @type programmi: dict
+    @return: -1 se il problema è "UNSATISFIABLE", 1 se è stato trovato l'ottimo ("OPTIMUM FOUND"), 0 per altri casi.
     @rtype: int
     """
     print("Running program...")
-    output_file = "output.txt"
-    ret = 0
-    
-    with subprocess.Popen(
-        ["bash", "execute.sh"], 
-        stdout=subprocess.PIPE, 
-        stderr=subprocess.PIPE,
-        text=True
-    ) as process, open(output_file, "a") as f:
-        # Legge l'output riga per riga
-        for line in process.stdout:
-            print(line.strip())
-            f.write(line.strip() + "\n")
-
-        # Attende la terminazione del processo
-        process.wait()
-        
-    with open(output_file, "r") as f:
-        content = f.read()
-        if "UNSATISFIABLE" in content:
-            ret = -1
-        elif "OPTIMUM FOUND" in content:
-            ret = 1
-        
-    # Rimuove il file temporaneo
-    if os.path.exists(output_file):
-        os.remove(output_file)
-    
-    return ret
+    return esito(Solver().aggiungi_fatti(programmi).risolvi())
 
+def run_incrementale(solver, filters_corsi):
+    """
+    Risolve il problema per i corsi indicati riutilizzando il grounding del solver incrementale.
+
+    @param solver: Solver incrementale su cui è stato caricato il programma con tutti i corsi.
+    @type solver: SolverIncrementale
+    @param filters_corsi: Dizionario con la lista dei codici dei corsi attivi in "Cod. Corso di Studio".
+    @type filters_corsi: dict
+    @return: -1 se il problema è "UNSATISFIABLE", 1 se è stato trovato l'ottimo ("OPTIMUM FOUND"), 0 per altri casi.
+    @rtype: int
+    """
+    print("Running program (incrementale)...")
+    return esito(solver.risolvi(filters_corsi["Cod. Corso di Studio"]))
+
+def verifica_corso(code, models=16, threads=1, time_limit=60, cache=None):
+    """
+    Verifica un singolo corso generando e risolvendo in memoria il suo programma.
+    Viene eseguita nei processi del pool di `verifica_corsi`.
+
+    @param code: Codice del corso da verificare.
+    @type code: str
+    @param models: Numero massimo di modelli da calcolare.
+    @type models: int
+    @param threads: Numero di thread del solver per ogni processo.
+    @type threads: int
+    @param time_limit: Limite di tempo in secondi per la risoluzione.
+    @type time_limit: int
+    @param cache: Cache dei risultati: un corso già verificato con gli stessi fatti non viene risolto di nuovo.
+    @type cache: ResultCache
+    @return: Riga della tabella dei risultati (corso, stato, dimensione del grounding e tempi).
+    @rtype: dict
+    """
+    programmi = genera(filtra_corsi([code]), output_dir=None)
+    risultato = Solver(models=models, threads=threads, time_limit=time_limit, cache=cache).aggiungi_fatti(programmi).risolvi()
+    lp = risultato.statistiche["problem"]["lp"]
+    return {
+        "Corso": code,
+        "Stato": risultato.stato,
+        "Atomi": int(lp["atoms"]),
+        "Regole": int(lp["rules"]),
+        "Tempo grounding": round(risultato.tempo_grounding, 3),
+        "Tempo risoluzione": round(risultato.tempo_risoluzione, 3)
+    }
+
+def verifica_corsi(codes, workers=None, **kwargs):
+    """
+    Verifica i corsi uno alla volta distribuendoli su un pool di processi.
+
+    @param codes: Codici dei corsi da verificare.
+    @type codes: list
+    @param workers: Numero di processi del pool. Default: numero di CPU.
+    @type workers: int
+    @param kwargs: Parametri del solver passati a `verifica_corso`.
+    @return: Tabella dei risultati, ordinata per codice del corso.
+    @rtype: pandas.DataFrame
+    """
+    righe = list()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(verifica_corso, code, **kwargs): code for code in codes}
+        for future in as_completed(futures):
+            code = futures[future]
+            try:
+                riga = future.result()
+            except Exception as e:
+                print(f"Errore durante la verifica di {code}: {e}")
+                riga = {"Corso": code, "Stato": "ERROR"}
+            print(f"{riga['Stato']} {code}")
+            righe.append(riga)
+
+    colonne = ["Corso", "Stato", "Atomi", "Regole", "Tempo grounding", "Tempo risoluzione"]
+    return pd.DataFrame(righe, columns=colonne).sort_values("Corso", ignore_index=True)
+
+def diagnostica_corsi(codes, threads=None, time_limit=60):
+    """
+    Individua con un'unica risoluzione i corsi e le famiglie di vincoli che rendono il problema
+    insoddisfacibile, al posto delle esecuzioni ripetute escludendo un corso alla volta.
+
+    @param codes: Codici dei corsi da diagnosticare insieme (filtrati con `filtra_corsi`, come nelle altre verifiche).
+    @type codes: list
+    @param threads: Numero di thread del solver.
+    @type threads: int
+    @param time_limit: Limite di tempo in secondi per ogni risoluzione.
+    @type time_limit: int
+    @return: Stato del problema e tabella del nucleo insoddisfacibile minimale (corso, vincolo).
+    @rtype: tuple
+    """
+    programmi = genera(filtra_corsi(codes), output_dir=None)
+    stato, nucleo = SolverDiagnosi(threads=threads, time_limit=time_limit).aggiungi_fatti(programmi).diagnostica()
+    righe = [{"Corso": corso, "Vincolo": famiglia} for famiglia, corso in nucleo]
+    return stato, pd.DataFrame(righe, columns=["Corso", "Vincolo"])
 
 def main():
     """
@@ -137,31 +228,31 @@ def main():
     if not os.path.exists(filepathCorsi) or not os.path.exists(filepathProf):
         init_corsi_matricole(filepathCorsi, filepathProf)
     
-    # Inizializza il Dataset Manager
-    dataset_manager = DatasetManager(dataset_path=filepathCorsi)
-
-    # Ottiene la lista dei dipartimenti
-    courses = dataset_manager.get_courses()
-
     parser = CourseParser()
-    parser.add_courses(courses)
+    parser.parser.add_argument("--incrementale", action="store_true",
+                               help="Esegue il test delle tuple crescenti con un unico grounding (risoluzione multi-shot)")
+    parser.parser.add_argument("--diagnosi", action="store_true",
+                               help="Individua con il nucleo insoddisfacibile i corsi e i vincoli che rendono il problema insoddisfacibile")
     args = parser.parse()
     
-    filters_corsi = {"Cod. Corso di Studio" : list()}
-    if not any(vars(args).values()):
+    # Risolve la selezione dei corsi sulla tabella dei corsi
+    selettore = CourseSelector(path_coperture)
+    try:
+        codici_corsi = selettore.seleziona(codici=args.corsi, file=args.file, tipi=args.tipo,
+                                           dipartimento=args.dipartimento, tutti=args.all)
+    except (ValueError, OSError) as e:
+        parser.parser.error(str(e))
+
+    if args.elenco:
+        print(selettore.elenco(codici_corsi or None))
+        return
+
+    if not codici_corsi:
         print("Errore: nessun dipartimento selezionato.")
         parser.parser.print_help()
         exit()
-        
-    if args.all:
-        for key in courses.keys():
-            filters_corsi["Cod. Corso di Studio"].append(key)
-    else:
-        for key in courses.keys():
-            if getattr(args, key, False):
-                filters_corsi["Cod. Corso di Studio"].append(key)
 
-    filters_corsi ["Cod. Corso di Studio"] = list(set(filters_corsi ["Cod. Corso di Studio"]))
+    filters_corsi = {"Cod. Corso di Studio" : codici_corsi}
     
     dsl = DatasetLoader(path_coperture)
     df_tmp = dsl.filter_by_values(filters=filters_corsi, only_prefix=False)
@@ -179,20 +270,28 @@ def main():
 
     all_codes = filters_corsi["Cod. Corso di Studio"]
     
+    if args.diagnosi:
+        print(f"Diagnosi di {len(all_codes)} corsi")
+        stato, nucleo = diagnostica_corsi(all_codes, threads=args.threads, time_limit=args.time_limit)
+        print(stato)
+        if not nucleo.empty:
+            nucleo.to_csv("diagnosi.csv", index=False)
+            print(nucleo.to_string(index=False))
+        elif stato == "UNSATISFIABLE":
+            print("Il problema è insoddisfacibile indipendentemente dai vincoli dei singoli corsi")
+        return
+    
     print(f"Testing one-by-one")
-    banned_codes = list()
     
-    for code in all_codes:
-        print(f"Testing {code}")
-        current_codes = {"Cod. Corso di Studio": [code]}
-        write(current_codes)
-        
-        res = run()
-        if res == -1:
-            print(f"Errore con {code}")
-            banned_codes.append(code)
-        else:
-            print(f"OK {code}")
+    # I corsi sono indipendenti: ogni processo del pool genera e risolve in memoria un corso
+    # con un solo thread del solver (salvo diversa indicazione con --threads)
+    risultati = verifica_corsi(all_codes, workers=args.workers, models=args.models,
+                               threads=args.threads or 1, time_limit=args.time_limit,
+                               cache=None if args.no_cache else ResultCache())
+    risultati.to_csv("one-by-one.csv", index=False)
+    print(risultati.to_string(index=False))
+    
+    banned_codes = risultati.loc[risultati["Stato"] == "UNSATISFIABLE", "Corso"].tolist()
     
     # scrive la lista di codici da escludere in un file (one-by-one.txt)
     banned_codes_file = "one-by-one-banned.txt"
@@ -214,14 +313,22 @@ def main():
     banned_codes = list()
     accepted_lines = list()
     
+    if args.incrementale:
+        # Grounding unico di tutti i corsi accettati: ogni tupla viene risolta attivando
+        # i suoi corsi tramite assunzioni, senza rigenerare i fatti
+        solver = SolverIncrementale()
+        solver.aggiungi_fatti(genera(filtra_corsi(accepted_codes), output_dir=None, condizionale=True))
+    
     for code in accepted_codes:
         current_codes["Cod. Corso di Studio"].append(code)
         
         print(f"Testing {current_codes['Cod. Corso di Studio']}")
         
-        write(current_codes)
-        
-        res = run()
+        if args.incrementale:
+            res = run_incrementale(solver, current_codes)
+        else:
+            programmi = write(current_codes)
+            res = run(programmi)
         if res == -1:
             print(f"Errore con {code}")
             banned_codes.append(f"{code}, {current_codes["Cod. Corso di Studio"]}")
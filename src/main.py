@@ -1,9 +1,15 @@
 from modules.dataset_manager import DatasetManager
 from modules.course_parser import CourseParser
+from modules.course_selector import CourseSelector
 from modules.dataset_loader import DatasetLoader
+from modules.solver import Solver, RisultatoSolver
+from modules.president_matcher import PresidentMatcher
+from modules.component_analyzer import ComponentAnalyzer
+from modules.portfolio import Portfolio
+from modules.result_cache import ResultCache
+from concurrent.futures import ProcessPoolExecutor
 import os
 import pandas as pd
-from fuzzywuzzy import process, fuzz
 
 
 
@@ -25,6 +31,11 @@ paths_immatricolati = ["dataset/immatricolati/LT.xlsx", "dataset/immatricolati/L
 # Percorso del file contenente l'elenco dei corsi con i rispettivi massimi teorici
 path_elenco_allegato = "dataset/elenco_allegato.xlsx"
 
+# Cartella e file con l'elenco dei corsi e delle matricole dei docenti per corso
+dataset_corsi_dir = 'dataset/corsi/'
+filepathCorsi = dataset_corsi_dir + 'codici-corsi.csv'
+filepathProf = dataset_corsi_dir + 'codici-matricole.csv'
+
 # Numero minimo di insegnamenti richiesti per considerare valido un corso
 NUMERO_MINIMO_DI_INSEGNAMENTI = 9
 
@@ -116,51 +127,21 @@ def init_corsi_matricole(filepathCorsi, filepathProf):
 def clean_text(text):
     return text.lower().strip().replace("'", "").replace("à", "a").replace("è", "e").replace("é", "e").replace("ì", "i").replace("ò", "o").replace("ù", "u")
 
-def main():
+def filtra_corsi(codici_corsi):
     """
-    Funzione principale per l'elaborazione e la gestione dei dati.
+    Rimuove dai corsi selezionati quelli che non possono essere analizzati.
 
-    La funzione esegue le seguenti operazioni:
-    1. Inizializza i dataset dei corsi e delle matricole se non esistono.
-    2. Filtra e salva i dati dei corsi, docenti e coperture.
-    3. Genera i file richiesti in base ai parametri specificati (corsi, docenti, coperture, immatricolati).
-    
-    - Crea e gestisce i filtri per i corsi in base ai parametri di input.
-    - Gestisce i file di dati e li salva nella struttura appropriata.
-    
-    :return: Nessuno. Il flusso di elaborazione termina.
-    :rtype: None
-    """
-    dataset_dir = 'dataset/corsi/'
-    filepathCorsi = dataset_dir + 'codici-corsi.csv'
-    filepathProf = dataset_dir + 'codici-matricole.csv'
-    
-    if not os.path.exists(dataset_dir):
-        os.makedirs(dataset_dir)
-    if not os.path.exists(filepathCorsi) or not os.path.exists(filepathProf):
-        init_corsi_matricole(filepathCorsi, filepathProf)
-    
-    # Inizializza il Dataset Manager
-    dataset_manager = DatasetManager(dataset_path=filepathCorsi)
+    Vengono esclusi:
+    1. I corsi con un numero di insegnamenti non superiore a `NUMERO_MINIMO_DI_INSEGNAMENTI`.
+    2. I corsi esclusi manualmente perché richiedono garanti al 50% per funzionare.
 
-    # Ottiene la lista dei dipartimenti
-    courses = dataset_manager.get_courses()
-
-    parser = CourseParser()
-    parser.add_courses(courses)
-    args = parser.parse()
-    
-    filters_corsi = {"Cod. Corso di Studio" : list()}
-    
-    if args.all:
-        for key in courses.keys():
-            filters_corsi["Cod. Corso di Studio"].append(key)
-    else:
-        for key in courses.keys():
-            if getattr(args, key, False):
-                filters_corsi["Cod. Corso di Studio"].append(key)
+    Args:
+        codici_corsi (list): Codici dei corsi selezionati.
 
-    filters_corsi ["Cod. Corso di Studio"] = list(set(filters_corsi ["Cod. Corso di Studio"]))
+    :return: Lista dei codici dei corsi validi.
+    :rtype: list
+    """
+    filters_corsi = {"Cod. Corso di Studio" : list(set(codici_corsi))}
     
     dsl = DatasetLoader(path_coperture)
     df_tmp = dsl.filter_by_values(filters=filters_corsi, only_prefix=False)
@@ -178,12 +159,25 @@ def main():
     
     # Esclusione manuale dei corsi che con richiedo garanti al 50% per funzionare
     hand_exluded = set(["5079", "5080"])
-    filters_corsi ["Cod. Corso di Studio"] = list(set(filters_corsi ["Cod. Corso di Studio"]) - hand_exluded)
-    
-    if not any(vars(args).values()):
-        print("Errore: nessun dipartimento selezionato.")
-        parser.parser.print_help()
-        exit()
+    return list(set(filters_corsi ["Cod. Corso di Studio"]) - hand_exluded)
+
+def genera(codici_corsi, output_dir="lp", condizionale=False, precedente=None):
+    """
+    Genera i programmi ASP (docenti, coperture, docenti a contratto, presidenti e ministeriali)
+    per i corsi indicati.
+
+    Args:
+        codici_corsi (list): Codici dei corsi per cui generare i fatti (già filtrati con `filtra_corsi`).
+        output_dir (str): Cartella in cui salvare i file `.lp`. Se None, i programmi restano solo in memoria.
+        condizionale (bool): Se True, i fatti di ogni corso dipendono dall'atomo esterno `attivo(Corso)`
+                             (vedi `SolverIncrementale`).
+        precedente (str): File `garanti.xlsx` di una soluzione precedente (vedi `utils/post-proc.py`)
+                          da cui far partire la ricerca. Se None, non viene generato `warm_start.lp`.
+
+    :return: Dizionario nome del file -> testo del programma ASP generato.
+    :rtype: dict
+    """
+    filters_corsi = {"Cod. Corso di Studio" : list(codici_corsi)}
     
     filters_docenti = {"Matricola": list()}
     
@@ -197,40 +191,40 @@ def main():
                 
     filters_docenti ["Matricola"] = list(set(filters_docenti ["Matricola"]))
     
+    # Un solo DatasetManager per tutte le scritture, così le tabelle derivate (es. docenti normalizzati)
+    # calcolate da un metodo possono essere riutilizzate dagli altri
+    dataset_manager = DatasetManager(output_dir=output_dir, condizionale=condizionale)
+
     ### SCRITTURA DOCENTI 
     dataset_loader = DatasetLoader(path_docenti)
     data = dataset_loader.filter_by_values(filters=filters_docenti, only_prefix=False)
-    dataset_manager = DatasetManager()
     dataset_manager.scrivi_docenti(data, 'docenti')
 
     ### SCRITTURA CORSI
-    dataset_loader = DatasetLoader(path_coperture)
-    data = dataset_loader.filter_by_values(filters=filters_corsi, only_prefix=True)
-    dataset_manager = DatasetManager()
-    dataset_manager.scrivi_coperture(data, 'coperture')
+    # Coperture dei corsi selezionati, filtrate una sola volta per corsi, ministeriali e presidenti
+    dsl_coperture = DatasetLoader(path_coperture)
+    coperture = dsl_coperture.filter_by_values(filters=filters_corsi, only_prefix=True)
+    dataset_manager.scrivi_coperture(coperture, 'coperture')
 
     ### SCRITTURA DOCENTI A CONTRATTO
     dataset_loader = DatasetLoader(path_docenti_a_contratto)
     data = dataset_loader.get_values()
-    dataset_manager = DatasetManager()
     dataset_manager.scrivi_docenti_a_contratto(data, 'docenti_a_contratto')
     
     ### SCRITTURA MINISTERIALE
-    dataset_loader = DatasetLoader(path_coperture)
-    data = dataset_loader.filter_by_values(filters=filters_corsi, only_prefix=True)
-    data = data[["Cod. Corso di Studio", "Cod. Tipo Corso"]].drop_duplicates()
+    data = coperture[["Cod. Corso di Studio", "Cod. Tipo Corso"]].drop_duplicates()
     
     # TODO aggiungere scrittura presidenti corsi di laurea
     ### SCRITTURA PRESIDENTI -> preferenza
-    dsl_coperture = DatasetLoader(path_coperture)
     dsl_allegato = DatasetLoader(path_elenco_allegato)
     
     
     
-    dsc = dsl_coperture.filter_by_values(filters=filters_corsi, only_prefix=True)
-    dsc = dsc[["Cod. Corso di Studio", "Cognome", "Nome", "Matricola"]]
+    dsc = coperture[["Cod. Corso di Studio", "Cognome", "Nome", "Matricola"]].copy()
     
-    dsc["Nome e Cognome"] = dsc["Nome"].apply(clean_text) + " " + dsc["Cognome"].apply(clean_text)
+    # I nomi si ripetono su molte coperture: ogni nome distinto viene normalizzato una sola volta
+    puliti = {testo: clean_text(testo) for testo in pd.unique(pd.concat([dsc["Nome"], dsc["Cognome"]]))}
+    dsc["Nome e Cognome"] = dsc["Nome"].map(puliti) + " " + dsc["Cognome"].map(puliti)
     filter_corsi2  = dict()
     filter_corsi2["CODICE U-GOV"] = filters_corsi["Cod. Corso di Studio"]
     dsa = dsl_allegato.filter_by_values(filters=filter_corsi2, only_prefix=True)
@@ -238,34 +232,22 @@ def main():
     dsa["PRESIDENTE"] = dsa["PRESIDENTE"].apply(clean_text)
     # print(dsa)
     
-    def most_similar(name, choices, scorer, threshold=90):
-        """
-        Effettua il fuzzy matching tra una stringa e una lista di scelte.
-        Restituisce la corrispondenza migliore se supera la soglia.
-        """
-        best_match, score = process.extractOne(name, choices, scorer=scorer)
-        if score >= threshold:
-            return best_match
-        # se non c'è match ritorna none
-        return None
-    
-    dsc["Match presidente"] = dsc["Nome e Cognome"].apply(
-        lambda x: most_similar(x, dsa["PRESIDENTE"].to_list(), fuzz.token_sort_ratio)
-    )
+    # Ogni nome distinto viene confrontato solo con i presidenti che possono superare la soglia
+    matcher = PresidentMatcher(threshold=90)
+    dsc["Match presidente"] = matcher.abbina(dsc["Nome e Cognome"].tolist(), dsa["PRESIDENTE"].tolist())
     merged_df = dsa.merge(dsc, how="left", left_on="PRESIDENTE", right_on="Match presidente")
     
     
     merged_df = merged_df[merged_df["CODICE U-GOV"] == merged_df["Cod. Corso di Studio"]]
     # merged_df.to_excel("presidenti.xlsx", index=False)
     
-    dataset_manager = DatasetManager()
     dataset_manager.scrivi_presidenti(merged_df, "presidenti")
     
     
     # Carica i file strutturalmente identici e li combina in un unico DataFrame
     immatricolati_dfs = []
     for path in paths_immatricolati:
-        immatricolati_dfs.append(pd.read_excel(path, engine="openpyxl", dtype=str))
+        immatricolati_dfs.append(DatasetLoader(path, dtype=str).get_values())
 
     # Combina tutti i DataFrame caricati in uno unico
     immatricolati_df = pd.concat(immatricolati_dfs, ignore_index=True)
@@ -283,7 +265,7 @@ def main():
     
     # carica il df al path di "path_elenco_allegato" e mappa su "Massimo Teorico" del df "data"
     # i valori contenuti nella colonna "N. max" dove il "Cod. Corso di Studio" (data) è uguale a "CODICE U-GOV"(df_allegato)
-    df_allegato = pd.read_excel(path_elenco_allegato, engine="openpyxl", dtype=str)
+    df_allegato = DatasetLoader(path_elenco_allegato, dtype=str).get_values()
     mapping_massimo_teorico = df_allegato.set_index("CODICE U-GOV")["N. max"].to_dict()
     data["Massimo Teorico"] = data["Cod. Corso di Studio"].map(mapping_massimo_teorico)
     # se il valore di "Massimo Teorico" è nullo, allora sostituisci con il valore di "Immatricolati"
@@ -291,8 +273,318 @@ def main():
 
     # data.to_excel("tmp.xlsx", index=False)
     
-    dataset_manager = DatasetManager()
     dataset_manager.scrivi_ministeriali(data, "minesteriali")
 
+    ### SCRITTURA SOLUZIONE PRECEDENTE -> euristica di partenza
+    path_warm_start = os.path.join(output_dir or "", "warm_start.lp")
+    if precedente:
+        dataset_manager.scrivi_warm_start(pd.read_excel(precedente, engine="openpyxl"), "warm_start")
+    elif output_dir and os.path.exists(path_warm_start):
+        # Il file di un'esecuzione precedente verrebbe altrimenti caricato da lazy-run.sh
+        os.remove(path_warm_start)
+
+    return dataset_manager.programmi
+
+def risolvi(programmi, models=16, threads=None, time_limit=60, configurazione=None, opzioni=None, cache=None):
+    """
+    Risolve il problema in-process con la classe Solver, senza rileggere i file `.lp` dal disco.
+
+    I modelli vengono stampati man mano nello stesso formato di clingo (`Answer:`/`Optimization:`),
+    così l'output può essere passato direttamente a `utils/post-proc.py`.
+
+    Args:
+        programmi (dict): Programmi ASP generati da `genera`.
+        models (int): Numero massimo di modelli da calcolare (0 per tutti).
+        threads (int): Numero di thread da utilizzare.
+        time_limit (int): Limite di tempo in secondi.
+        configurazione (dict): Euristica ("heuristic") e opzioni ("options") di clingo, ad esempio
+                               il profilo salvato dal portfolio. Default: quelle della classe Solver.
+        opzioni (list): Ulteriori opzioni di clingo (vedi `opzioni_obiettivo`).
+        cache (ResultCache): Cache dei risultati: se contiene già l'istanza, il risultato viene
+                             restituito senza risolvere di nuovo. Default: None.
+
+    :return: Il risultato della risoluzione.
+    :rtype: RisultatoSolver
+    """
+    opzioni = list(opzioni or [])
+    if configurazione:
+        solver = Solver(models=models, threads=threads, time_limit=time_limit,
+                        heuristic=configurazione["heuristic"], options=configurazione["options"] + opzioni, cache=cache)
+    else:
+        solver = Solver(models=models, threads=threads, time_limit=time_limit, options=opzioni, cache=cache)
+    solver.aggiungi_fatti(programmi)
+
+    def stampa_modello(model, risultato):
+        print(f"Answer: {risultato.modelli}")
+        print(" ".join(risultato.simboli))
+        if risultato.costo:
+            print("Optimization: " + " ".join(str(c) for c in risultato.costo), flush=True)
+
+    risultato = solver.risolvi(on_model=stampa_modello)
+    if risultato.da_cache:
+        print("Risultato letto dalla cache (tempi della risoluzione originale)")
+    print(risultato.stato)
+    print(f"Models       : {risultato.modelli}")
+    print(f"Time         : {risultato.tempo_grounding + risultato.tempo_risoluzione:.3f}s (Grounding: {risultato.tempo_grounding:.3f}s, Solving: {risultato.tempo_risoluzione:.3f}s)")
+    return risultato
+
+def opzioni_obiettivo(livelli=False, core=False):
+    """
+    Restituisce le opzioni di clingo per la modalità dell'obiettivo di `main.lp`.
+
+    Args:
+        livelli (bool): Se True, usa l'ottimizzazione lessicografica a livelli (`-c obiettivo=livelli`)
+                        al posto della somma pesata su un unico livello.
+        core (bool): Se True, usa l'ottimizzazione guidata dai core (`--opt-strategy=usc`), che
+                     dimostra l'ottimo un livello alla volta.
+
+    :return: Lista di opzioni di clingo.
+    :rtype: list
+    """
+    opzioni = list()
+    if livelli:
+        opzioni.append("--const=obiettivo=livelli")
+    if core:
+        opzioni.append("--opt-strategy=usc")
+    return opzioni
+
+def componenti(codici_corsi):
+    """
+    Raggruppa i corsi in componenti indipendenti: due corsi sono nella stessa componente se
+    (anche indirettamente) condividono un docente che può essere loro garante.
+
+    Args:
+        codici_corsi (list): Codici dei corsi (già filtrati con `filtra_corsi`).
+
+    :return: Lista delle componenti, ciascuna come lista di codici dei corsi.
+    :rtype: list
+    """
+    filters_corsi = {"Cod. Corso di Studio" : list(codici_corsi)}
+    coperture = DatasetLoader(path_coperture).filter_by_values(filters=filters_corsi, only_prefix=True)
+
+    # Solo i docenti non a contratto possono essere garanti di un solo corso
+    matricole_docenti = DatasetLoader(path_docenti).get_values(columns=["Matricola"])["Matricola"].astype(str)
+    coperture = coperture[coperture["Matricola"].astype(str).isin(set(matricole_docenti))]
+
+    coppie = zip(coperture["Cod. Corso di Studio"].astype(str), coperture["Matricola"].astype(str))
+    return ComponentAnalyzer().componenti(coppie, corsi=[str(codice) for codice in codici_corsi])
+
+def risolvi_componente(codici_corsi, models=16, threads=1, time_limit=60, precedente=None, opzioni=None, cache=None):
+    """
+    Genera in memoria e risolve il problema ristretto ai corsi di una componente.
+    Viene eseguita nei processi del pool di `risolvi_per_componenti`.
+
+    Args:
+        codici_corsi (list): Codici dei corsi della componente.
+        models (int): Numero massimo di modelli da calcolare (0 per tutti).
+        threads (int): Numero di thread del solver (None per il default della classe Solver).
+        time_limit (int): Limite di tempo in secondi.
+        precedente (str): File `garanti.xlsx` da cui far partire la ricerca (vedi `genera`).
+        opzioni (list): Ulteriori opzioni di clingo (vedi `opzioni_obiettivo`).
+        cache (ResultCache): Cache dei risultati (vedi `risolvi`).
+
+    :return: Dizionario con i corsi, lo stato, il costo, gli atomi mostrati e il tempo totale della risoluzione.
+    :rtype: dict
+    """
+    programmi = genera(codici_corsi, output_dir=None, precedente=precedente)
+    solver = Solver(models=models, threads=threads, time_limit=time_limit, options=opzioni, cache=cache)
+    risultato = solver.aggiungi_fatti(programmi).risolvi()
+
+    return {
+        "corsi": codici_corsi,
+        "stato": risultato.stato,
+        "costo": risultato.costo,
+        "simboli": risultato.simboli,
+        "tempo": risultato.tempo_grounding + risultato.tempo_risoluzione
+    }
+
+def unisci_componenti(risultati):
+    """
+    Unisce le soluzioni delle componenti in un'unica risposta.
+
+    I termini delle funzioni obiettivo di `main.lp` sono indicizzati per corso oppure per un docente
+    non a contratto, che è candidato solo nei corsi di una componente, tranne quelli sui docenti a
+    contratto distinti (`jolly_usati`): con J jolly e P_i posti assegnati a jolly nella componente i, il
+    problema completo premia min(J, P_1 + ... + P_n) jolly, le componenti min(J, P_i) ciascuna. La somma
+    dei costi delle componenti è quindi, livello per livello, minore o uguale al costo della risposta unita
+    e la somma dei loro ottimi è un limite inferiore dell'ottimo del problema completo: il costo effettivo
+    della risposta unita viene calcolato da `verifica_unione`. Gli atomi vengono uniti così come sono,
+    perché i vincoli sui jolly valgono corso per corso.
+
+    Args:
+        risultati (list): Risultati restituiti da `risolvi_componente`.
+
+    :return: Il risultato complessivo.
+    :rtype: RisultatoSolver
+    """
+    unito = RisultatoSolver()
+    stati = [r["stato"] for r in risultati]
+    if "UNSATISFIABLE" in stati:
+        unito.stato = "UNSATISFIABLE"
+    elif "UNKNOWN" in stati:
+        unito.stato = "UNKNOWN"
+    elif all(stato == "OPTIMUM FOUND" for stato in stati):
+        unito.stato = "OPTIMUM FOUND"
+    else:
+        unito.stato = "SATISFIABLE"
+
+    if unito.stato in ("UNSATISFIABLE", "UNKNOWN"):
+        return unito
+
+    unito.modelli = 1
+    costi = [r["costo"] for r in risultati]
+    if len(set(len(costo) for costo in costi)) == 1:
+        unito.costo = [sum(livello) for livello in zip(*costi)]
+
+    for r in risultati:
+        unito.simboli.extend(r["simboli"])
+
+    unito.tempo_risoluzione = sum(r["tempo"] for r in risultati)
+    return unito
+
+def verifica_unione(unito, codici_corsi, time_limit=60, precedente=None, opzioni=None):
+    """
+    Calcola il costo della risposta unita delle componenti sul problema completo (vedi `Solver.valuta`).
+
+    La risposta resta ottima solo se lo sono tutte le componenti e il suo costo coincide con la somma
+    dei loro costi, che è un limite inferiore dell'ottimo (vedi `unisci_componenti`); altrimenti è
+    soltanto una soluzione ammissibile ("SATISFIABLE"). In entrambi i casi il costo riportato è quello
+    del problema completo.
+
+    Args:
+        unito (RisultatoSolver): Risultato restituito da `unisci_componenti`.
+        codici_corsi (list): Codici di tutti i corsi (già filtrati con `filtra_corsi`).
+        time_limit (int): Limite di tempo in secondi.
+        precedente (str): File `garanti.xlsx` da cui far partire la ricerca (vedi `genera`).
+        opzioni (list): Ulteriori opzioni di clingo (vedi `opzioni_obiettivo`).
+
+    :return: Il risultato complessivo aggiornato.
+    :rtype: RisultatoSolver
+    """
+    programmi = genera(codici_corsi, output_dir=None, precedente=precedente)
+    solver = Solver(models=0, threads=1, time_limit=time_limit, options=opzioni)
+    valutazione = solver.aggiungi_fatti(programmi).valuta(unito.simboli)
+
+    if not valutazione.modelli:
+        print(f"Attenzione: la risposta unita non è stata verificata sul problema completo ({valutazione.stato})")
+        if unito.stato == "OPTIMUM FOUND":
+            unito.stato = "SATISFIABLE"
+        return unito
+
+    if unito.stato == "OPTIMUM FOUND" and valutazione.costo != unito.costo:
+        unito.stato = "SATISFIABLE"
+    unito.costo = valutazione.costo
+    return unito
+
+def risolvi_per_componenti(codici_corsi, models=16, threads=None, time_limit=60, workers=None, precedente=None, opzioni=None,
+                           cache=None):
+    """
+    Risolve il problema scomponendolo nelle componenti indipendenti dei corsi (vedi `componenti`),
+    risolte in parallelo da un pool di processi, e stampa la risposta unita nello stesso formato di `risolvi`.
+
+    Args:
+        codici_corsi (list): Codici dei corsi (già filtrati con `filtra_corsi`).
+        models (int): Numero massimo di modelli da calcolare per componente (0 per tutti).
+        threads (int): Numero di thread del solver per componente. Default: 1 se le componenti
+                       sono più di una, altrimenti quello della classe Solver.
+        time_limit (int): Limite di tempo in secondi per componente.
+        workers (int): Numero di processi del pool. Default: numero di CPU.
+        precedente (str): File `garanti.xlsx` da cui far partire la ricerca (vedi `genera`).
+        opzioni (list): Ulteriori opzioni di clingo (vedi `opzioni_obiettivo`).
+        cache (ResultCache): Cache dei risultati, condivisa dalle componenti (vedi `risolvi`).
+
+    :return: Il risultato complessivo.
+    :rtype: RisultatoSolver
+    """
+    gruppi = componenti(codici_corsi)
+    print(f"Componenti indipendenti: {len(gruppi)} (corsi per componente: {', '.join(str(len(g)) for g in gruppi)})")
+
+    if len(gruppi) == 1:
+        # Una sola componente: il problema non si scompone e viene risolto con tutti i thread
+        risultati = [risolvi_componente(gruppi[0], models, threads, time_limit, precedente, opzioni, cache)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(risolvi_componente, gruppo, models, threads or 1, time_limit, precedente, opzioni, cache)
+                       for gruppo in gruppi]
+            risultati = [future.result() for future in futures]
+
+    for r in risultati:
+        print(f"{r['stato']:<14} {r['tempo']:>8.3f}s  costo: {r['costo']}  corsi: {' '.join(r['corsi'])}")
+
+    risultato = unisci_componenti(risultati)
+    if len(risultati) > 1 and risultato.modelli:
+        risultato = verifica_unione(risultato, codici_corsi, time_limit, precedente, opzioni)
+    if risultato.modelli:
+        print("Answer: 1")
+        print(" ".join(risultato.simboli))
+        if risultato.costo:
+            print("Optimization: " + " ".join(str(c) for c in risultato.costo))
+    print(risultato.stato)
+    print(f"Time         : {risultato.tempo_risoluzione:.3f}s (somma dei tempi delle componenti)")
+    return risultato
+
+def main():
+    """
+    Funzione principale per l'elaborazione e la gestione dei dati.
+
+    La funzione esegue le seguenti operazioni:
+    1. Inizializza i dataset dei corsi e delle matricole se non esistono.
+    2. Risolve la selezione dei corsi (codici, file di codici, filtri su tipo e dipartimento) con `CourseSelector`.
+    3. Genera i file richiesti in base ai parametri specificati (corsi, docenti, coperture, immatricolati).
+    4. Se richiesto con `--solve`, risolve il problema in-process tramite l'API Python di clingo.
+    
+    - Crea e gestisce i filtri per i corsi in base ai parametri di input.
+    - Gestisce i file di dati e li salva nella struttura appropriata.
+    
+    :return: Nessuno. Il flusso di elaborazione termina.
+    :rtype: None
+    """
+    if not os.path.exists(dataset_corsi_dir):
+        os.makedirs(dataset_corsi_dir)
+    if not os.path.exists(filepathCorsi) or not os.path.exists(filepathProf):
+        init_corsi_matricole(filepathCorsi, filepathProf)
+    
+    parser = CourseParser()
+    args = parser.parse()
+
+    # Risolve la selezione dei corsi sulla tabella dei corsi
+    selettore = CourseSelector(path_coperture)
+    try:
+        codici_corsi = selettore.seleziona(codici=args.corsi, file=args.file, tipi=args.tipo,
+                                           dipartimento=args.dipartimento, tutti=args.all)
+    except (ValueError, OSError) as e:
+        parser.parser.error(str(e))
+
+    if args.elenco:
+        print(selettore.elenco(codici_corsi or None))
+        return
+
+    if not codici_corsi:
+        print("Errore: nessun dipartimento selezionato.")
+        parser.parser.print_help()
+        exit()
+    
+    codici_corsi = filtra_corsi(codici_corsi)
+    programmi = genera(codici_corsi, precedente=args.warm_start)
+    opzioni = opzioni_obiettivo(livelli=args.livelli, core=args.core)
+    cache = None if args.no_cache else ResultCache()
+
+    if args.portfolio is not None:
+        portfolio = Portfolio(configurazioni=args.portfolio or None, time_limit=args.time_limit, workers=args.workers)
+        Portfolio.stampa(portfolio.esegui(programmi))
+    elif args.solve and args.componenti:
+        risolvi_per_componenti(codici_corsi, models=args.models, threads=args.threads, time_limit=args.time_limit,
+                               workers=args.workers, precedente=args.warm_start, opzioni=opzioni, cache=cache)
+    elif args.solve:
+        # Usa la configurazione migliore trovata dal portfolio per questi corsi, oppure la più recente
+        # (vedi `Portfolio.profilo`).
+        # I profili sono calcolati con l'obiettivo piatto e la strategia di default, quindi non
+        # vengono usati se la modalità dell'obiettivo è stata scelta esplicitamente.
+        profilo = None if opzioni else Portfolio().profilo(programmi)
+        if profilo:
+            print(f"Configurazione dal profilo del portfolio: {profilo['nome']}")
+        risolvi(programmi, models=args.models, threads=args.threads, time_limit=args.time_limit,
+                configurazione=profilo, opzioni=opzioni, cache=cache)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
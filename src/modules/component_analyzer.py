@@ -0,0 +1,68 @@
+class ComponentAnalyzer:
+    """
+    Classe per la scomposizione del problema dei garanti in sottoproblemi indipendenti.
+
+    In `main.lp` due corsi interagiscono solo tramite i docenti candidati in entrambi, che non
+    possono essere garanti di due corsi contemporaneamente e che le funzioni obiettivo contano una
+    sola volta. I vincoli sui docenti a contratto (`jolly`) valgono corso per corso, quindi i jolly non
+    collegano i corsi.
+    I corsi vengono quindi raggruppati nelle componenti connesse del grafo in cui due corsi sono
+    collegati se condividono almeno un docente candidato: ogni componente può essere risolta
+    separatamente dalle altre. Le funzioni obiettivo premiano però i jolly distinti di tutti i corsi
+    (`jolly_usati`), quindi la somma dei costi delle componenti è solo un limite inferiore del costo
+    della risposta unita (vedi `unisci_componenti` in `main.py`).
+    """
+
+    def __init__(self):
+        """
+        Inizializza l'analizzatore con una struttura union-find vuota.
+        """
+        self.padri = dict()
+
+    def _radice(self, corso):
+        """
+        Restituisce il rappresentante della componente del corso, comprimendo il cammino.
+        """
+        radice = corso
+        while self.padri[radice] != radice:
+            radice = self.padri[radice]
+        while self.padri[corso] != radice:
+            self.padri[corso], corso = radice, self.padri[corso]
+        return radice
+
+    def _unisci(self, corso1, corso2):
+        """
+        Unisce le componenti dei due corsi.
+        """
+        radice1, radice2 = self._radice(corso1), self._radice(corso2)
+        if radice1 != radice2:
+            self.padri[radice2] = radice1
+
+    def componenti(self, coppie, corsi=()):
+        """
+        Calcola le componenti connesse dei corsi.
+
+        :param coppie: Coppie (codice corso, matricola docente candidato), ad esempio le righe
+                       delle coperture con matricola dei docenti non a contratto.
+        :type coppie: iterable
+        :param corsi: Ulteriori corsi da includere, anche se privi di docenti candidati.
+        :type corsi: iterable
+        :return: Lista delle componenti, ciascuna come lista ordinata di codici dei corsi,
+                 dalla più grande alla più piccola.
+        :rtype: list
+        """
+        self.padri = {corso: corso for corso in corsi}
+        corso_del_docente = dict()
+
+        for corso, docente in coppie:
+            self.padri.setdefault(corso, corso)
+            if docente in corso_del_docente:
+                self._unisci(corso_del_docente[docente], corso)
+            else:
+                corso_del_docente[docente] = corso
+
+        gruppi = dict()
+        for corso in self.padri:
+            gruppi.setdefault(self._radice(corso), list()).append(corso)
+
+        return sorted((sorted(gruppo) for gruppo in gruppi.values()), key=lambda gruppo: (-len(gruppo), gruppo))
@@ -1,36 +1,75 @@
+import re
 from argparse import ArgumentParser
 
 class CourseParser:
     """
     Classe gestire il parsing dei corsi utilizzando il modulo argparse.
-    Consente di aggiungere corsi come argomenti dinamici e di effettuare il parsing
-    degli argomenti della riga di comando.
+    I corsi vengono indicati per codice, tramite un file di codici o con filtri sul tipo e sul
+    dipartimento, e vengono risolti sulla tabella dei corsi da `CourseSelector`: il parser non
+    dipende quindi dal numero di corsi del dataset.
     """
+
+    # Codici di corso non assegnati dal parser: nella forma `--<codice>`, accettata per compatibilità,
+    # oppure codici indicati dopo un'opzione (es. `3027 --solve 5069`)
+    CODICE = re.compile(r"(?:--)?(\d+)")
+
     def __init__(self):
         """
         Inizializza il parser per i corsi.
-        Il parser supporta l'argomento `--all` per selezionare tutti i corsi.
+        Il parser supporta i codici dei corsi (anche nella forma `--<codice>`), l'argomento `--all` per
+        selezionare tutti i corsi, i filtri della selezione e le opzioni per risolvere il problema
+        in-process (`--solve`), con gli stessi parametri di `lazy-run.sh`.
         """
         self.parser = ArgumentParser(description="Seleziona il corso da caricare")
-        self.parser.add_argument("--all", action="store_true", help="Seleziona tutti i corsi")
 
-    def add_courses(self, courses):
-        """
-        Ogni corso viene aggiunto come un argomento con nome `--<codice>`, 
-        dove `<codice>` rappresenta il codice del corso.
+        selezione = self.parser.add_argument_group("selezione dei corsi", "I corsi indicati per codice o da file vengono uniti; "
+                                                   "senza codici, i filtri si applicano a tutti i corsi")
+        selezione.add_argument("corsi", nargs="*", metavar="CODICE",
+                               help="Codici dei corsi da selezionare (anche nella forma --<codice>, es. --3027)")
+        selezione.add_argument("--all", action="store_true", help="Seleziona tutti i corsi")
+        selezione.add_argument("-f", "--file", action="append", default=None, metavar="FILE",
+                               help="File con i codici dei corsi, separati da spazi, virgole o a capo (ripetibile)")
+        selezione.add_argument("--tipo", nargs="+", default=None, metavar="TIPO",
+                               help="Mantiene solo i corsi dei tipi indicati (es. LT LM LM5)")
+        selezione.add_argument("--dipartimento", default=None, metavar="TESTO",
+                               help="Mantiene solo i corsi dei dipartimenti il cui nome contiene il testo indicato")
+        selezione.add_argument("--elenco", action="store_true", help="Stampa i corsi selezionati (tutti, se nessuno) ed esce")
 
-        :param courses: Dizionario contenente i corsi. La chiave è il codice del corso 
-                        (str), mentre il valore è il nome del corso (str).
-        :type courses: dict
-        """
-        for code, name  in courses.items():
-            self.parser.add_argument(f"--{code}", action="store_true", help=f"Seleziona il corso {name} ({code})")
+        self.parser.add_argument("--warm-start", default=None, metavar="GARANTI_XLSX",
+                                 help="Fa partire la ricerca dai garanti di una soluzione precedente (garanti.xlsx di utils/post-proc.py)")
+
+        solver = self.parser.add_argument_group("risoluzione", "Opzioni per risolvere il problema con l'API Python di clingo")
+        solver.add_argument("--solve", action="store_true", help="Risolve il problema dopo aver generato i fatti")
+        solver.add_argument("-m", "--models", type=int, default=16, help="Numero di modelli da calcolare, 0 per tutti (default: 16)")
+        solver.add_argument("-p", "--threads", type=int, default=None, help="Numero di thread (default: numero di CPU meno 2)")
+        solver.add_argument("-t", "--time-limit", type=int, default=60, help="Limite di tempo in secondi (default: 60)")
+        solver.add_argument("--livelli", action="store_true",
+                            help="Ottimizza le preferenze in ordine lessicografico: docenti a contratto, presidenti, TAF/SSD, fasce")
+        solver.add_argument("--core", action="store_true",
+                            help="Usa l'ottimizzazione guidata dai core di clingo (--opt-strategy=usc), un livello alla volta")
+        solver.add_argument("--componenti", action="store_true",
+                            help="Risolve separatamente, in parallelo, i gruppi di corsi che non condividono docenti")
+        solver.add_argument("--portfolio", nargs="*", default=None, metavar="CONFIGURAZIONE",
+                            help="Confronta in parallelo le configurazioni di clingo indicate (default: tutte) e salva la migliore, "
+                                 "usata automaticamente dalle successive esecuzioni con --solve")
+        solver.add_argument("--no-cache", action="store_true",
+                            help="Non usa la cache dei risultati (dataset/.cache/risultati) e risolve sempre di nuovo")
+        solver.add_argument("-w", "--workers", type=int, default=None,
+                            help="Numero di processi per le risoluzioni in parallelo (default: numero di CPU)")
 
-    def parse(self):
+    def parse(self, args=None):
         """
         Effettua il parsing degli argomenti della riga di comando.
+        Gli argomenti nella forma `--<codice>` e i codici non assegnati vengono aggiunti ai codici dei corsi (`corsi`).
 
+        :param args: Lista degli argomenti. Default: None, gli argomenti della riga di comando.
+        :type args: list
         :return: Un oggetto contenente gli argomenti parsati come attributi.
         :rtype: argparse.Namespace
         """
-        return self.parser.parse_args()
\ No newline at end of file
+        parsed, sconosciuti = self.parser.parse_known_args(args)
+        codici = [self.CODICE.fullmatch(argomento) for argomento in sconosciuti]
+        if not all(codici):
+            self.parser.error(f"argomenti non riconosciuti: {' '.join(sconosciuti)}")
+        parsed.corsi += [codice.group(1) for codice in codici]
+        return parsed
\ No newline at end of file
@@ -0,0 +1,119 @@
+import re
+from modules.dataset_loader import DatasetLoader
+
+class CourseSelector:
+    """
+    Classe per la selezione dei corsi da analizzare a partire da una tabella indicizzata per codice corso.
+
+    La tabella viene costruita una sola volta dal file delle coperture (letto tramite la cache di
+    `DatasetLoader`) e contiene, per ogni corso, il nome, il tipo e il dipartimento. I corsi possono
+    essere selezionati per codice, da un file di codici o tramite filtri sul tipo e sul dipartimento,
+    sia dalla riga di comando (vedi `CourseParser`) sia da Python:
+
+        CourseSelector().seleziona(tipi=["LM"], dipartimento="ingegneria")
+    """
+
+    # Separatori ammessi tra i codici nei file di selezione
+    SEPARATORI = re.compile(r"[\s,;]+")
+
+    def __init__(self, path_coperture="dataset/coperture.xlsx"):
+        """
+        Inizializza il selettore costruendo la tabella dei corsi.
+
+        :param path_coperture: Percorso del file delle coperture. Default: "dataset/coperture.xlsx".
+        :type path_coperture: str
+        """
+        df = DatasetLoader(path_coperture).get_values(
+            columns=["Cod. Corso di Studio", "Des. Corso di Studio", "Cod. Tipo Corso", "Dipartimento carico didattico"]
+        )
+        df = df.rename(columns={
+            "Cod. Corso di Studio": "codice",
+            "Des. Corso di Studio": "nome",
+            "Cod. Tipo Corso": "tipo",
+            "Dipartimento carico didattico": "dipartimento"
+        })
+        df = df.assign(
+            codice=df["codice"].astype(str),
+            nome=df["nome"].astype(str).str.strip().str.lower(),
+            tipo=df["tipo"].astype(str).str.strip().str.upper(),
+            dipartimento=df["dipartimento"].astype(str).str.strip()
+        )
+
+        # Una riga per corso, nell'ordine in cui i corsi compaiono nelle coperture
+        self.tabella = df.drop_duplicates(subset="codice").set_index("codice")
+
+    @classmethod
+    def leggi_file(cls, path):
+        """
+        Legge un file di codici corso: un codice per riga oppure separati da spazi, virgole o punti e virgola.
+        Il testo che segue `#` è un commento; il prefisso `--` dei codici viene ignorato, così è possibile
+        riusare gli argomenti di una vecchia riga di comando (`--3027 --5069`).
+
+        :param path: Percorso del file.
+        :type path: str
+        :return: Lista dei codici letti, nell'ordine del file.
+        :rtype: list
+        :raises OSError: Se il file non può essere letto.
+        """
+        codici = list()
+        with open(path) as f:
+            for riga in f:
+                testo = riga.split("#", 1)[0]
+                codici.extend(codice.lstrip("-") for codice in cls.SEPARATORI.split(testo) if codice.lstrip("-"))
+        return codici
+
+    def seleziona(self, codici=None, file=None, tipi=None, dipartimento=None, tutti=False):
+        """
+        Risolve una selezione di corsi sulla tabella dei corsi.
+
+        I corsi indicati con `codici` e `file` vengono uniti; se non ne viene indicato nessuno (o con
+        `tutti`), si parte da tutti i corsi. I filtri `tipi` e `dipartimento` restringono poi la selezione.
+
+        :param codici: Codici dei corsi. Default: None.
+        :type codici: list
+        :param file: Percorsi di file di codici (vedi `leggi_file`). Default: None.
+        :type file: list
+        :param tipi: Tipi di corso da mantenere (es. ["LM", "LM5"]), senza distinzione tra maiuscole e minuscole.
+                     Default: None, tutti i tipi.
+        :type tipi: list
+        :param dipartimento: Testo contenuto nel nome del dipartimento (es. "ingegneria"), senza distinzione
+                             tra maiuscole e minuscole. Default: None, tutti i dipartimenti.
+        :type dipartimento: str
+        :param tutti: Se True, seleziona tutti i corsi prima di applicare i filtri. Default: False.
+        :type tutti: bool
+        :return: Lista dei codici selezionati, senza ripetizioni, nell'ordine della tabella.
+        :rtype: list
+        :raises ValueError: Se uno o più codici non corrispondono ad alcun corso.
+        :raises OSError: Se un file di codici non può essere letto.
+        """
+        richiesti = [str(codice) for codice in (codici or [])]
+        for path in file or []:
+            richiesti.extend(self.leggi_file(path))
+
+        if richiesti and not tutti:
+            sconosciuti = sorted(set(richiesti).difference(self.tabella.index))
+            if sconosciuti:
+                raise ValueError(f"Corsi inesistenti: {', '.join(sconosciuti)}")
+            selezione = self.tabella.index.isin(richiesti)
+        elif tutti or tipi or dipartimento:
+            selezione = self.tabella.index.notna()
+        else:
+            return list()
+
+        if tipi:
+            selezione &= self.tabella["tipo"].isin([tipo.upper() for tipo in tipi]).to_numpy()
+        if dipartimento:
+            selezione &= self.tabella["dipartimento"].str.contains(dipartimento, case=False, regex=False).to_numpy()
+        return self.tabella.index[selezione].tolist()
+
+    def elenco(self, codici=None):
+        """
+        Restituisce la descrizione testuale dei corsi indicati, una riga per corso.
+
+        :param codici: Codici dei corsi da descrivere. Default: None, tutti i corsi.
+        :type codici: list
+        :return: Tabella dei corsi (codice, tipo, nome e dipartimento) in formato testo.
+        :rtype: str
+        """
+        tabella = self.tabella if codici is None else self.tabella.loc[list(codici)]
+        return tabella[["tipo", "nome", "dipartimento"]].to_string(index_names=False)
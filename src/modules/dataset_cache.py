@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+class DatasetCache:
+    """
+    Classe per la gestione di una cache dei fogli Excel già letti.
+
+    La cache lavora su due livelli:
+    - in memoria: ogni file viene letto al più una volta per processo;
+    - su disco: ogni foglio viene salvato in formato colonnare (un file NumPy `.npy` per colonna)
+      che, nelle esecuzioni successive, viene caricato tramite memory-mapping invece di
+      eseguire nuovamente il parsing del file Excel con openpyxl.
+
+    La validità di una voce su disco è verificata tramite percorso, data di modifica e dimensione
+    del file; se questi non coincidono viene confrontato l'hash del contenuto prima di ricalcolarla.
+    """
+
+    # Memo condiviso tra tutte le istanze: (percorso, variante, mtime, dimensione) -> DataFrame
+    _memo = dict()
+
+    def __init__(self, cache_dir="dataset/.cache"):
+        """
+        Inizializza la cache con la cartella in cui salvare i fogli in formato colonnare.
+
+        :param cache_dir: Percorso della cartella della cache su disco. Default: "dataset/.cache".
+                          Se None, viene utilizzata solo la cache in memoria.
+        :type cache_dir: str
+        """
+        self.cache_dir = cache_dir
+
+    def carica(self, input_file_path, reader, variante=""):
+        """
+        Restituisce il DataFrame associato al file, leggendolo solo se non è già presente in cache.
+
+        :param input_file_path: Percorso del file da caricare.
+        :type input_file_path: str
+        :param reader: Funzione che riceve il percorso del file e restituisce il DataFrame letto.
+        :type reader: callable
+        :param variante: Identifica il modo in cui `reader` legge il file (es. "str" se tutte le colonne
+                         sono lette come stringhe): lo stesso file letto in modi diversi ha voci distinte. Default: "".
+        :type variante: str
+        :return: Copia del DataFrame letto dal file.
+        :rtype: pandas.DataFrame
+        """
+        path = os.path.abspath(input_file_path)
+        stat = os.stat(path)
+        chiave = (path, variante, stat.st_mtime_ns, stat.st_size)
+
+        if chiave not in DatasetCache._memo:
+            df = self._carica_da_disco(path, stat, variante) if self.cache_dir else None
+            if df is None:
+                df = reader(path)
+                if self.cache_dir:
+                    self._salva_su_disco(path, stat, df, variante)
+            DatasetCache._memo[chiave] = df
+
+        # Restituisce una copia per evitare che i chiamanti modifichino il dato condiviso
+        return DatasetCache._memo[chiave].copy()
+
+    def _cartella(self, path, variante=""):
+        """
+        Restituisce la cartella della cache associata ad un file.
+        """
+        # Senza variante il nome resta quello delle voci già salvate
+        nome = hashlib.sha1((path + (f"\0{variante}" if variante else "")).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, nome)
+
+    @staticmethod
+    def _hash_file(path):
+        """
+        Calcola l'hash SHA-256 del contenuto di un file.
+        """
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for blocco in iter(lambda: f.read(1 << 20), b""):
+                sha.update(blocco)
+        return sha.hexdigest()
+
+    def _carica_da_disco(self, path, stat, variante=""):
+        """
+        Carica il DataFrame dalla cache colonnare su disco.
+
+        :return: Il DataFrame ricostruito, oppure None se la voce non esiste o non è più valida.
+        :rtype: pandas.DataFrame
+        """
+        cartella = self._cartella(path, variante)
+        manifest_path = os.path.join(cartella, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+            if manifest["mtime"] != stat.st_mtime_ns or manifest["size"] != stat.st_size:
+                # Il file è stato toccato: è ancora valido solo se il contenuto è identico
+                if manifest["sha256"] != self._hash_file(path):
+                    return None
+                manifest["mtime"] = stat.st_mtime_ns
+                manifest["size"] = stat.st_size
+                self._scrivi_manifest(cartella, manifest)
+
+            colonne = dict()
+            for i, colonna in enumerate(manifest["colonne"]):
+                valori = np.load(os.path.join(cartella, f"{i}.npy"), mmap_mode="r")
+                if colonna["tipo"] == "testo":
+                    nulli = np.load(os.path.join(cartella, f"{i}.mask.npy"), mmap_mode="r")
+                    valori = valori.astype(object)
+                    valori[nulli] = np.nan
+                colonne[colonna["nome"]] = valori
+            return pd.DataFrame(colonne, columns=[c["nome"] for c in manifest["colonne"]])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Attenzione: cache non valida per '{path}', il file verrà riletto. {e}")
+            return None
+
+    def _salva_su_disco(self, path, stat, df, variante=""):
+        """
+        Salva il DataFrame nella cache colonnare su disco.
+
+        Sono supportate le colonne numeriche e le colonne testuali con eventuali valori mancanti;
+        se il foglio contiene altri tipi di dato viene mantenuto solo nella cache in memoria.
+        """
+        colonne = list()
+        array = list()
+        for nome in df.columns:
+            serie = df[nome]
+            if not isinstance(nome, str):
+                return
+            if serie.dtype.kind in "biufcmM":
+                colonne.append({"nome": nome, "tipo": "numero"})
+                array.append((serie.to_numpy(), None))
+            elif serie.dtype == object and serie.map(lambda v: isinstance(v, str) or pd.isna(v)).all():
+                nulli = serie.isna().to_numpy()
+                colonne.append({"nome": nome, "tipo": "testo"})
+                array.append((serie.fillna("").to_numpy().astype(str), nulli))
+            else:
+                return
+
+        cartella = self._cartella(path, variante)
+        manifest_path = os.path.join(cartella, "manifest.json")
+        try:
+            os.makedirs(cartella, exist_ok=True)
+            # Invalida l'eventuale voce precedente prima di sovrascriverne le colonne
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            for i, (valori, nulli) in enumerate(array):
+                np.save(os.path.join(cartella, f"{i}.npy"), valori)
+                if nulli is not None:
+                    np.save(os.path.join(cartella, f"{i}.mask.npy"), nulli)
+
+            # Il manifest è scritto per ultimo: una voce senza manifest non viene mai letta
+            self._scrivi_manifest(cartella, {
+                "path": path,
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": self._hash_file(path),
+                "colonne": colonne
+            })
+        except OSError as e:
+            print(f"Attenzione: impossibile salvare la cache per '{path}'. {e}")
+
+    @staticmethod
+    def _scrivi_manifest(cartella, manifest):
+        """
+        Scrive il manifest di una voce della cache in modo atomico.
+        """
+        tmp_path = os.path.join(cartella, "manifest.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(cartella, "manifest.json"))
@@ -1,17 +1,33 @@
 import openpyxl
 import pandas as pd
+from modules.dataset_cache import DatasetCache
 
 class DatasetLoader:
     """
     Classe per la gestione del caricamento, filtraggio e salvataggio dei dati da file Excel o CSV.
     """
 
-    def __init__(self, input_file_path="dataset/coperture.xlsx"):
+    def __init__(self, input_file_path="dataset/coperture.xlsx", cache_dir="dataset/.cache", dtype=None):
         """
         Inizializza la classe DatasetLoader con il percorso al dataset.
         :param input_file_path: Path relativo al file Excel da leggere (default: "dataset/coperture.xlsx").
+        :param cache_dir: Cartella della cache colonnare dei fogli già letti (default: "dataset/.cache").
+                          Se None, il file viene letto solo tramite la cache in memoria del processo.
+        :param dtype: Tipo con cui leggere tutte le colonne (es. str), come in `pandas.read_excel` (default: None,
+                      tipi dedotti dal contenuto).
         """
         self.input_file_path = input_file_path
+        self.cache = DatasetCache(cache_dir)
+        self.dtype = dtype
+
+    def _leggi_file(self):
+        """
+        Legge il primo foglio del file Excel, passando dalla cache se disponibile.
+        :return: DataFrame contenente l'intero foglio.
+        """
+        reader = lambda path: pd.read_excel(path, sheet_name=0, header=0, engine="openpyxl", dtype=self.dtype)
+        variante = "" if self.dtype is None else getattr(self.dtype, "__name__", str(self.dtype))
+        return self.cache.carica(self.input_file_path, reader, variante)
     
     def get_values(self, dataset=None, columns=None):
         """
@@ -26,8 +42,7 @@ class DatasetLoader:
 
             if dataset is None:
                 # Legge l'intero file
-                df = pd.read_excel(self.input_file_path, engine="openpyxl")
-                df = pd.read_excel(self.input_file_path, sheet_name=0, header=0, usecols=None, nrows=None)
+                df = self._leggi_file()
             else:
                 df = dataset
             
@@ -57,7 +72,7 @@ class DatasetLoader:
         try:
             if dataset is None:
                 # Carica l'intero dataset
-                df = pd.read_excel(self.input_file_path, engine="openpyxl")
+                df = self._leggi_file()
             else:
                 df = dataset
             
@@ -1,6 +1,55 @@
+import hashlib
+import io
 import os
 import pandas as pd
 import math
+import re
+from contextlib import contextmanager
+from modules.fragment_cache import FragmentCache
+
+# Versione del generatore: i frammenti in cache vengono ricalcolati a ogni modifica di questo file
+with open(__file__, "rb") as _sorgente:
+    VERSIONE = hashlib.sha256(_sorgente.read()).hexdigest()
+
+# Atomo con argomenti costanti (numeri o costanti simboliche), come scritto dai metodi `scrivi_*`
+_ATOMO = re.compile(r"([a-z]\w*)\(((?:[a-z]\w*|\d+)(?:, (?:[a-z]\w*|\d+))*)\)", re.ASCII)
+
+def _raggruppa(sezioni):
+    """
+    Suddivide le righe generate per ogni sezione di un programma nei frammenti dei rispettivi gruppi.
+
+    :param sezioni: Dizionario nome della sezione -> (gruppi, posizioni, testi): tre serie allineate con
+                    il gruppo (es. il corso), la posizione della riga di origine all'interno del gruppo
+                    (colonna `_riga`, vedi `DatasetManager._frammenti`) e il testo da scrivere.
+    :type sezioni: dict
+    :return: Dizionario gruppo -> frammento (dizionario nome della sezione -> lista di [posizione, testo]).
+    :rtype: dict
+    """
+    frammenti = dict()
+    for nome, (gruppi, posizioni, testi) in sezioni.items():
+        for gruppo, posizione, testo in zip(gruppi.tolist(), posizioni.tolist(), testi.tolist()):
+            frammenti.setdefault(gruppo, dict()).setdefault(nome, list()).append([posizione, testo])
+    return frammenti
+
+def _unisci(frammenti, sezione, uniche=False):
+    """
+    Concatena le righe di una sezione dei frammenti nell'ordine delle righe del dataset da cui sono
+    state generate, come se il programma fosse stato generato in un'unica passata.
+
+    :param frammenti: Lista di coppie (posizioni delle righe del gruppo nel dataset, frammento),
+                      restituita da `DatasetManager._frammenti`.
+    :type frammenti: list
+    :param sezione: Nome della sezione.
+    :type sezione: str
+    :param uniche: Se True, le righe ripetute in più frammenti vengono scritte una sola volta (es. `ssd/1`).
+    :type uniche: bool
+    :return: Lista delle righe da scrivere.
+    :rtype: list
+    """
+    righe = [(indici[posizione], testo) for indici, frammento in frammenti for posizione, testo in frammento.get(sezione, [])]
+    righe.sort(key=lambda riga: riga[0])
+    testi = [testo for _, testo in righe]
+    return list(dict.fromkeys(testi)) if uniche else testi
 
 class DatasetManager:
     """
@@ -11,14 +60,152 @@ class DatasetManager:
     - Generare file ASP (.lp) contenenti i dati processati e strutturati.
     """
 
-    def __init__(self, dataset_path="dataset/"):
+    # TAF delle cattedre che compaiono nelle funzioni obiettivo di `main.lp`
+    TAF_OBIETTIVO = ["a", "b", "c"]
+
+    def __init__(self, dataset_path="dataset/", output_dir="lp", condizionale=False, cache_dir="dataset/.cache/frammenti"):
         """
         Inizializza la classe DatasetManager con il percorso della cartella contenente i file di dataset.
 
         :param dataset_path: Percorso alla cartella contenente i file di dataset. Default: "dataset/".
         :type dataset_path: str
+        :param output_dir: Cartella in cui scrivere i file ASP generati. Default: "lp".
+                           Se None, i programmi vengono mantenuti solo in memoria (vedi `self.programmi`).
+        :type output_dir: str
+        :param condizionale: Se True, i fatti di ciascun corso (`codice_corso` e `ministeriale`) vengono
+                             subordinati all'atomo esterno `attivo(Corso)`, così che i corsi possano essere
+                             attivati o disattivati senza rigenerare il programma (risoluzione multi-shot).
+                             Default: False.
+        :type condizionale: bool
+        :param cache_dir: Cartella della cache dei frammenti (vedi `_frammenti`). Default: "dataset/.cache/frammenti".
+                          Se None, ogni programma viene generato interamente a ogni chiamata.
+        :type cache_dir: str
         """
         self.dataset_path = dataset_path
+        self.output_dir = output_dir
+        self.condizionale = condizionale
+
+        # Programmi ASP generati, indicizzati per nome del file (senza estensione)
+        self.programmi = dict()
+
+        # Tabella normalizzata dei docenti, calcolata da `normalizza_docenti`
+        self.docenti = None
+
+        # Frammenti dei programmi già generati, per gruppo di righe del dataset
+        self.cache = FragmentCache(cache_dir, versione=VERSIONE) if cache_dir else None
+
+    @staticmethod
+    def istruzioni(testo):
+        """
+        Scompone un programma generato nelle istruzioni da aggiungere tramite il backend di clingo (vedi `Solver`).
+
+        I metodi `scrivi_*` scrivono, una per riga, fatti, regole con un corpo di soli atomi positivi e atomi
+        esterni, tutti con argomenti costanti: queste righe vengono convertite in tuple senza passare dal parser
+        di clingo. Le altre righe (es. `jolly(1..5).` o le direttive `#heuristic` di `scrivi_warm_start`)
+        restano testo, nello stesso ordine.
+
+        :param testo: Testo di un programma generato (es. un valore di `self.programmi`).
+        :type testo: str
+        :return: Tripla (regole, esterni, resto): le regole come coppie (testa, corpo), dove la testa è un atomo
+                 e il corpo una tupla di atomi (vuota per i fatti), gli atomi esterni `[free]` e il testo delle
+                 righe non convertite. Ogni atomo è una coppia (nome, tupla degli argomenti come stringhe).
+        :rtype: tuple
+        """
+        regole, esterni, resto = list(), list(), list()
+        for riga in testo.splitlines():
+            if not riga or riga.startswith("%"):
+                continue
+            if riga.startswith("#external ") and riga.endswith(". [free]"):
+                atomo = _ATOMO.fullmatch(riga[len("#external "):-len(". [free]")])
+                if atomo:
+                    esterni.append((atomo.group(1), tuple(atomo.group(2).split(", "))))
+                    continue
+            elif riga.endswith("."):
+                testa, _, corpo = riga[:-1].partition(" :- ")
+                atomo = _ATOMO.fullmatch(testa)
+                atomi = list(_ATOMO.finditer(corpo))
+                # Il corpo deve essere composto solo da atomi separati da virgole
+                if atomo and ", ".join(a.group(0) for a in atomi) == corpo:
+                    regole.append((
+                        (atomo.group(1), tuple(atomo.group(2).split(", "))),
+                        tuple((a.group(1), tuple(a.group(2).split(", "))) for a in atomi)
+                    ))
+                    continue
+            resto.append(riga)
+        return regole, esterni, "\n".join(resto)
+
+    def _percorso(self, filename):
+        """
+        Restituisce il percorso del file ASP di output associato al nome indicato.
+        """
+        return os.path.join(self.output_dir or "", filename + '.lp')
+
+    @contextmanager
+    def _apri(self, filename):
+        """
+        Apre un buffer in memoria in cui i metodi di scrittura generano il programma ASP.
+
+        Alla chiusura il contenuto viene salvato in `self.programmi[filename]` e, se è
+        stata indicata una cartella di output, scritto anche su disco.
+
+        :param filename: Nome del file di output (senza estensione).
+        :type filename: str
+        """
+        buffer = io.StringIO()
+        yield buffer
+        self.programmi[filename] = buffer.getvalue()
+
+        if self.output_dir:
+            # Crea la cartella di output se non esiste
+            if not os.path.exists(self.output_dir):
+                os.makedirs(self.output_dir)
+
+            filepath = self._percorso(filename)
+            with open(filepath, "w") as file:
+                file.write(self.programmi[filename])
+            print(f"Dati salvati con successo in: {filepath}")
+
+    def _frammenti(self, tipo, righe, colonna, calcola):
+        """
+        Restituisce i frammenti di un programma, uno per ogni valore distinto di `colonna` (es. un corso).
+
+        Ogni frammento dipende solo dalle righe del proprio gruppo: la chiave in cache è l'hash di quelle
+        righe (vedi `FragmentCache.chiavi`) e `calcola` viene chiamata solo sulle righe dei gruppi i cui
+        frammenti non sono in cache, quindi aggiungendo o modificando un corso viene ricalcolato solo il suo.
+        Le righe dei frammenti sono associate alla posizione della riga di origine all'interno del gruppo
+        (colonna `_riga`), così `_unisci` le riporta nell'ordine del dataset corrente.
+
+        :param tipo: Tipo di programma (es. "coperture").
+        :type tipo: str
+        :param righe: DataFrame con le sole colonne da cui dipendono i frammenti.
+        :type righe: pandas.DataFrame
+        :param colonna: Colonna con il gruppo di ogni riga.
+        :type colonna: str
+        :param calcola: Funzione che riceve le righe di alcuni gruppi (con la colonna `_riga`) e restituisce
+                        il dizionario gruppo -> frammento (vedi `_raggruppa`).
+        :type calcola: callable
+        :return: Lista di coppie (posizioni delle righe del gruppo in `righe`, frammento), da passare a `_unisci`.
+        :rtype: list
+        """
+        righe = righe.reset_index(drop=True)
+        righe["_riga"] = righe.groupby(colonna, sort=False, dropna=False).cumcount()
+        gruppi = righe.groupby(colonna, sort=False, dropna=False).indices
+
+        if self.cache is None:
+            calcolati = calcola(righe)
+            return [(indici, calcolati.get(gruppo, dict())) for gruppo, indici in gruppi.items()]
+
+        contesto = f"{tipo}\0{self.condizionale}\0{self.docenti is not None}"
+        chiavi = self.cache.chiavi(contesto, righe, gruppi)
+        frammenti = {gruppo: self.cache.leggi(tipo, chiavi[gruppo]) for gruppo in gruppi}
+        mancanti = [gruppo for gruppo, frammento in frammenti.items() if frammento is None]
+        if mancanti:
+            calcolati = calcola(righe[righe[colonna].isin(mancanti)])
+            for gruppo in mancanti:
+                frammenti[gruppo] = calcolati.get(gruppo, dict())
+                self.cache.salva(tipo, chiavi[gruppo], frammenti[gruppo])
+            self.cache.scrivi(tipo)
+        return [(indici, frammenti[gruppo]) for gruppo, indici in gruppi.items()]
 
     def get_courses(self):
         """
@@ -68,12 +255,9 @@ class DatasetManager:
         :type filename: str
         :raises Exception: Se si verifica un errore durante la scrittura del file.
         """
-        
-        output_dir = 'lp'
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+
         comment_character = '% '
-        filepath = os.path.join(output_dir, filename + '.lp')
+        filepath = self._percorso(filename)
         
         parametri_ministeriali_minimi = {
             "lt": (9, 5, 4, 2),
@@ -85,70 +269,78 @@ class DatasetManager:
             "lcpc": (3, 1, 2, 1)
         }
 
+        def calcola(righe):
+            codici, posizioni, fatti = list(), list(), list()
+            for _, row in righe.iterrows():
+                tipo_corso = row["Cod. Tipo Corso"].lower()
+                codice_corso = row["Cod. Corso di Studio"]
+                
+                if tipo_corso in parametri_ministeriali_minimi:
+                    minimo_complessivo, minimo_ti, massimo_td, massimo_contratti = parametri_ministeriali_minimi[tipo_corso]
+                else:
+                    raise ValueError(f"Cod. Tipo Corso ({tipo_corso}) non coerente per il corso {codice_corso}")
+                
+                if pd.isna(row['Immatricolati']):
+                    pass
+                else:
+                    immatricolati = int(row["Immatricolati"])
+
+                    massimo_teorico = int(row["Massimo Teorico"])
+                    # il calcolo della W si applica solo se si superano i massimi teorici
+                    if immatricolati > massimo_teorico:
+                        w = (immatricolati / (1.0 * massimo_teorico)) - 1
+                        if w < 0:
+                            raise ValueError("w < 0")
+                        
+                        minimo_complessivo = math.floor(minimo_complessivo * (1 + w))
+                        # variano solo i docenti a tempo indeterminato
+                        minimo_ti = math.floor(minimo_ti * (1 + w))
+                        
+                        # il massimo dei contratti non viene aumentato
+                        massimo_contratti = math.floor(massimo_contratti * (1 + w))
+
+                fatto = f"ministeriale({codice_corso}, {minimo_complessivo}, {minimo_ti}, {massimo_td}, {massimo_contratti})"
+                codici.append(codice_corso)
+                posizioni.append(row["_riga"])
+                fatti.append(f"{fatto} :- attivo({codice_corso}).\n" if self.condizionale else f"{fatto}.\n")
+            return _raggruppa({"ministeriali": (pd.Series(codici, dtype=object), pd.Series(posizioni, dtype=int),
+                                                pd.Series(fatti, dtype=object))})
+
         try:
-            with open(filepath, "w") as file:
-                file.write(f"{comment_character} SEZIONE: Garanti minimi per corso (codice_corso, minimo_complessivo, docenti_ti, docenti_td, max_docenti_contratto)\n")
+            colonne = ["Cod. Corso di Studio", "Cod. Tipo Corso", "Immatricolati", "Massimo Teorico"]
+            frammenti = self._frammenti("ministeriali", df[colonne], "Cod. Corso di Studio", calcola)
 
-                # print(df)
-                
-                for _, row in df.iterrows():
-                    tipo_corso = row["Cod. Tipo Corso"].lower()
-                    codice_corso = row["Cod. Corso di Studio"]
-                    
-                    if tipo_corso in parametri_ministeriali_minimi:
-                        minimo_complessivo, minimo_ti, massimo_td, massimo_contratti = parametri_ministeriali_minimi[tipo_corso]
-                    else:
-                        raise ValueError(f"Cod. Tipo Corso ({tipo_corso}) non coerente per il corso {codice_corso}")
-                    
-                    if pd.isna(row['Immatricolati']):
-                        pass
-                    else:
-                        immatricolati = int(row["Immatricolati"])
-
-                        massimo_teorico = int(row["Massimo Teorico"])
-                        # il calcolo della W si applica solo se si superano i massimi teorici
-                        if immatricolati > massimo_teorico:
-                            w = (immatricolati / (1.0 * massimo_teorico)) - 1
-                            if w < 0:
-                                raise ValueError("w < 0")
-                            
-                            minimo_complessivo = math.floor(minimo_complessivo * (1 + w))
-                            # variano solo i docenti a tempo indeterminato
-                            minimo_ti = math.floor(minimo_ti * (1 + w))
-                            
-                            # il massimo dei contratti non viene aumentato
-                            massimo_contratti = math.floor(massimo_contratti * (1 + w))
-
-                    file.write(f"ministeriale({codice_corso}, {minimo_complessivo}, {minimo_ti}, {massimo_td}, {massimo_contratti}).\n")
-            
-            print(f"Dati salvati con successo in: {filepath}")
+            with self._apri(filename) as file:
+                file.write(f"{comment_character} SEZIONE: Garanti minimi per corso (codice_corso, minimo_complessivo, docenti_ti, docenti_td, max_docenti_contratto)\n")
+                file.writelines(_unisci(frammenti, "ministeriali"))
         except Exception as e:
             raise Exception(f"Errore durante il salvataggio dei dati su '{filepath}': {e}")
     
     def scrivi_presidenti(self, df, filename):
-        output_dir = 'lp'
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
         comment_character = '% '
-        # filepath = os.path.join(self.dataset_path, filename + '.lp')
-        filepath = os.path.join(output_dir, filename + '.lp')
-        added = set()
+        filepath = self._percorso(filename)
+
+        def calcola(righe):
+            codici, posizioni, testi = list(), list(), list()
+            added = set()
+            for _, row in righe.iterrows():
+                codice_corso = row["CODICE U-GOV"]
+                matricola_docente = row["Matricola"]
+                t = tuple([codice_corso, matricola_docente])
+                if t not in added:
+                    added.add(t)
+                    codici.append(codice_corso)
+                    posizioni.append(row["_riga"])
+                    testi.append(f"{comment_character} {row["PRESIDENTE"]}\n"
+                                 f"presidente({matricola_docente}, {codice_corso}) :- matricola_docente({matricola_docente}), codice_corso({codice_corso}).\n")
+            return _raggruppa({"presidenti": (pd.Series(codici, dtype=object), pd.Series(posizioni, dtype=int),
+                                              pd.Series(testi, dtype=object))})
+
         try:
-        
-            with open(filepath, "w") as f:
+            frammenti = self._frammenti("presidenti", df[["CODICE U-GOV", "Matricola", "PRESIDENTE"]], "CODICE U-GOV", calcola)
+            with self._apri(filename) as f:
                 f.write(f"{comment_character} SEZIONE: PRESIDENTI\n")
-                for _, row in df.iterrows():
-                    codice_corso = row["CODICE U-GOV"]
-                    matricola_docente = row["Matricola"]
-                    t = tuple([codice_corso, matricola_docente])
-                    if t not in added:
-                        added.add(t)
-                        f.write(f"{comment_character} {row["PRESIDENTE"]}\n")
-                        f.write(f"presidente({matricola_docente}, {codice_corso}) :- matricola_docente({matricola_docente}), codice_corso({codice_corso}).\n")
-            
-            print(f"Dati salvati con successo in: {filepath}")
-        
+                f.writelines(_unisci(frammenti, "presidenti"))
         except Exception as e:
             raise Exception(f"Errore durante il salvataggio dei dati su '{filepath}': {e}")
     
@@ -163,148 +355,198 @@ class DatasetManager:
         :raises Exception: Se si verifica un errore durante la scrittura del file.
         """
         # Crea la cartella 'lp' se non esiste
-        output_dir = 'lp'
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
         comment_character = '% '
-        # filepath = os.path.join(self.dataset_path, filename + '.lp')
-        filepath = os.path.join(output_dir, filename + '.lp')
-
-        # Set per tracciare valori già scritti
-        docenti_aggiunti = set()
-        corsi_aggiunti = set()
-        tipi_corso_aggiunti = set()
-        ssd_aggiunti = set()
-        taf_aggiunti = set()
+        filepath = self._percorso(filename)
 
         # Rimuove eventuali NaN e converte i valori in numeri interi
+        df = df.copy()
         df['Cod. Corso di Studio'] = df['Cod. Corso di Studio'].fillna(0).astype(int)
 
+        # Colonne normalizzate calcolate una sola volta per tutte le sezioni
+        # Non posso usare le lettere in maiuscolo perchè possono essere scambiate per variabili e non atomi
+        codice = df['Cod. Corso di Studio'].astype(str)
+        tipo = df['Cod. Tipo Corso'].str.lower()
+        taf = df['TAF'].str.lower()
+        ssd = df['SSD'].str.split('/')
+        ssd_valido = ssd.str.len() >= 2
+        prefisso_ssd = ssd.str[0]
+
         accepted_tafs = set(["a", "b"])
-        
-        # Dict per memorizzare gli ssd di un corso di laurea (il codice è l'identificativo)
-        corso_ssds = dict()
-        for _, row in df.iterrows():
-            
-            if not (row["TAF"].lower() in accepted_tafs):
-                continue
-            
-            if not (row["Cod. Corso di Studio"] in corso_ssds):
-                corso_ssds[row["Cod. Corso di Studio"]] = set()
-            
-            ssd = row["SSD"].split("/")
-            if len(ssd) < 2:
-                # print(f"Errore: {row['Cod. Corso di Studio']} non ha un SSD valido")
-                raise Exception(f"Errore: {row['Cod. Corso di Studio']} non ha un SSD valido")
-                # continue
-            
-            
-            ssd[0] = ssd[0].strip().replace("-", "")
-            corso_ssds[row["Cod. Corso di Studio"]].add(ssd[0])
-        
+
+        # Coppie (corso, ssd) degli insegnamenti con TAF accettato: sono gli ssd di un corso di laurea
+        caratterizzanti = taf.isin(accepted_tafs)
+        non_validi = caratterizzanti & ~ssd_valido
+        if non_validi.any():
+            raise Exception(f"Errore: {codice[non_validi].iloc[0]} non ha un SSD valido")
+
+        con_matricola = (df['Matricola'] != '') & (df['Matricola'].str.lower() != 'nan')
+
+        # Colonne normalizzate da cui dipendono i fatti di ogni corso (vedi `_frammenti`)
+        righe = pd.DataFrame({
+            "codice": codice,
+            "nome": df['Des. Corso di Studio'],
+            "tipo": tipo,
+            "taf": taf,
+            "ssd_valido": ssd_valido,
+            "prefisso_ssd": prefisso_ssd,
+            "caratterizzante": caratterizzanti,
+            "con_matricola": con_matricola,
+            "matricola": df.loc[con_matricola, 'Matricola'].astype(float).astype(int).astype(str),
+            "docente": df['Cognome'] + " " + df['Nome']
+        })
+        if self.docenti is not None:
+            # Le cattedre utili dipendono anche dalla presenza dei docenti (vedi `riduci_cattedre`)
+            righe["presente"] = righe["matricola"].isin(self.docenti["matricola"])
+
+        def calcola(righe):
+            sezioni = dict()
+
+            # Tipi di corso, SSD e TAF: ripetuti nei frammenti di più corsi, vengono scritti una sola volta
+            for nome, testi in [
+                ("lauree", "laurea(" + righe["tipo"] + ").\n"),
+                ("ssd", ("ssd(" + righe["prefisso_ssd"].str.lower().str.replace('-', '') + ").\n")[righe["ssd_valido"]]),
+                ("taf", "taf(" + righe["taf"] + ").\n")
+            ]:
+                testi = pd.DataFrame({"codice": righe["codice"], "_riga": righe["_riga"], "testo": testi}).dropna()
+                testi = testi.drop_duplicates(subset=["codice", "testo"])
+                sezioni[nome] = (testi["codice"], testi["_riga"], testi["testo"])
+
+            corso_ssds = pd.DataFrame({
+                "codice": righe.loc[righe["caratterizzante"], "codice"],
+                "settore": righe.loc[righe["caratterizzante"], "prefisso_ssd"].str.strip().str.replace("-", "")
+            }).drop_duplicates()
+
+            corsi = righe[["codice", "nome", "tipo", "_riga"]].drop_duplicates(subset="codice")
+            if self.condizionale:
+                # Il corso esiste solo se l'atomo esterno attivo(Corso) è vero; [free] lascia
+                # decidere il suo valore alle assunzioni passate al solver (vedi SolverIncrementale)
+                testi = (f"{comment_character} " + corsi["nome"] + " (" + corsi["codice"] + ")\n"
+                         + "#external attivo(" + corsi["codice"] + "). [free]\n"
+                         + "codice_corso(" + corsi["codice"] + ") :- attivo(" + corsi["codice"] + ").\n")
+            else:
+                testi = (f"{comment_character} " + corsi["nome"] + " (" + corsi["codice"] + ")\n"
+                         + "codice_corso(" + corsi["codice"] + ").\n")
+            sezioni["corsi"] = (corsi["codice"], corsi["_riga"], testi)
+
+            info = corsi.merge(corso_ssds, on="codice", how="inner")
+            info["settore"] = info["settore"].str.lower()
+            sezioni["info"] = (info["codice"], info["_riga"], (
+                f"{comment_character} Corso: " + info["codice"] + " (" + info["tipo"] + ")\n"
+                + "corso(" + info["codice"] + ", " + info["tipo"] + ", " + info["settore"] + ") :- codice_corso("
+                + info["codice"] + "), laurea(" + info["tipo"] + "), ssd(" + info["settore"] + ").\n"
+            ))
+
+            cattedre = righe.loc[righe["con_matricola"], ["codice", "matricola", "docente", "tipo", "taf", "_riga"]]
+            cattedre = cattedre.rename(columns={"docente": "nome"})
+            if self.docenti is not None:
+                cattedre = self.riduci_cattedre(cattedre)
+            sezioni["cattedre"] = (cattedre["codice"], cattedre["_riga"], (
+                f"{comment_character} Corso: " + cattedre["codice"] + ", Docente: " + cattedre["nome"] + "\n"
+                + "cattedra(" + cattedre["codice"] + ", " + cattedre["matricola"] + ", " + cattedre["tipo"] + ", "
+                + cattedre["taf"] + ") :- codice_corso(" + cattedre["codice"] + "), matricola_docente("
+                + cattedre["matricola"] + "), laurea(" + cattedre["tipo"] + "), taf(" + cattedre["taf"] + ").\n"
+            ))
+            return _raggruppa(sezioni)
+
         try:
-            with open(filepath, 'w') as file:
-                
+            frammenti = self._frammenti("coperture", righe, "codice", calcola)
+
+            with self._apri(filename) as file:
+
                 # Scrive la sezione dei tipi di corso
                 file.write(f"{comment_character} SEZIONE: Tipi di Corso\n")
-                for _, row in df.iterrows():
-                    # Non posso usare le lettere in maiuscolo perchè possono essere scambiate per variabili e non atomi
-                    tipo_corso = row['Cod. Tipo Corso'].lower()
-
-                    if tipo_corso not in tipi_corso_aggiunti:
-                        file.write(f"laurea({tipo_corso}).\n")
-                        tipi_corso_aggiunti.add(tipo_corso)
+                file.writelines(_unisci(frammenti, "lauree", uniche=True))
                 file.write("\n")
 
                 # Scrive la sezione dei vari SSD
                 file.write(f"{comment_character} SEZIONE: SSD\n")
-                for _, row in df.iterrows():
-                    
-                    ssd = row['SSD'].split('/')
-                    if len(ssd) < 2:
-                        continue
-                    
-                    settore = ssd[0].lower()
-                    settore = settore.replace('-', '')
-
-                    if settore not in ssd_aggiunti:
-                        file.write(f"ssd({settore}).\n")
-                        ssd_aggiunti.add(settore)
+                file.writelines(_unisci(frammenti, "ssd", uniche=True))
                 file.write("\n")
 
                 # Scrive la sezione dei TAF
                 file.write(f"{comment_character} SEZIONE: TAF\n")
-                for _, row in df.iterrows():
-                    taf = row['TAF'].lower()
-
-                    if taf not in taf_aggiunti:
-                        # file.write(f"{comment_character} {nome_corso} ({codice_corso})\n")
-                        file.write(f"taf({taf}).\n")
-                        taf_aggiunti.add(taf)
+                file.writelines(_unisci(frammenti, "taf", uniche=True))
                 file.write("\n")
 
                 # Scrive la sezione dei corsi
                 file.write(f"{comment_character} SEZIONE: Corsi\n")
-                for _, row in df.iterrows():
-                    codice_corso = int(float(row['Cod. Corso di Studio']))
-                    nome_corso = row['Des. Corso di Studio']
-
-                    if codice_corso not in corsi_aggiunti:
-                        file.write(f"{comment_character} {nome_corso} ({codice_corso})\n")
-                        file.write(f"codice_corso({codice_corso}).\n")
-                        corsi_aggiunti.add(codice_corso)
+                file.writelines(_unisci(frammenti, "corsi"))
                 file.write("\n")
 
-                corsi_aggiunti = set()
-                
                 # Scrive le informazioni complete sui corsi
                 file.write(f"{comment_character} SEZIONE: Informazioni Corsi\n")
-                for _, row in df.iterrows():
-                    codice_corso = int(float(row['Cod. Corso di Studio']))
-                    tipo_corso = row['Cod. Tipo Corso'].lower()
-                    
-                    if codice_corso not in corsi_aggiunti:
-                        # print("Codice corso:", codice_corso)
-                        if not codice_corso in corso_ssds:
-                            print(f"Errore: il corso {codice_corso} non ha SSD validi")
-                            continue
-                        
-                        settori = corso_ssds[codice_corso]
-                        for ssd in settori:
-                            settore = ssd.lower()
-                            file.write(f"{comment_character} Corso: {codice_corso} ({tipo_corso})\n")
-                            file.write(f"corso({codice_corso}, {tipo_corso}, {settore}) :- codice_corso({codice_corso}), laurea({tipo_corso}), ssd({settore}).\n")
-                            corsi_aggiunti.add(codice_corso)
-
+                for codice_corso in codice.drop_duplicates()[~codice.drop_duplicates().isin(codice[caratterizzanti])]:
+                    print(f"Errore: il corso {codice_corso} non ha SSD validi")
+                file.writelines(_unisci(frammenti, "info"))
                 file.write("\n")
-                
-                
+
                 # Scrive le relazioni tra corsi e docenti
                 file.write(f"{comment_character} SEZIONE: Relazioni Corsi-Docenti\n")
-                for _, row in df.iterrows():
-                    if not row['Matricola'] or row['Matricola'] is None or row['Matricola'].lower() == 'nan':
-                        continue
-                    else:
-                        matricola_docente = int(float(row['Matricola']))
-
-                    codice_corso = int(float(row['Cod. Corso di Studio']))
-                    nome_docente = row['Cognome'] + " " + row['Nome']
-                    tipo_corso = row['Cod. Tipo Corso'].lower()
-                    taf = row['TAF'].lower()
-
-                    file.write(f"{comment_character} Corso: {codice_corso}, Docente: {nome_docente}\n")
-                    file.write(f"cattedra({codice_corso}, {matricola_docente}, {tipo_corso}, {taf}) :- codice_corso({codice_corso}), matricola_docente({matricola_docente}), laurea({tipo_corso}), taf({taf}).\n")
+                file.writelines(_unisci(frammenti, "cattedre"))
                 file.write("\n")
-
-            print(f"Dati salvati con successo in: {filepath}")
         except Exception as e:
             raise Exception(f"Errore durante il salvataggio dei dati su '{filepath}': {e}")
     
+    def riduci_cattedre(self, cattedre):
+        """
+        Rimuove le cattedre che non possono influire sulla soluzione:
+        - le righe ripetute (stesso corso, docente e TAF);
+        - le cattedre di docenti assenti da `self.docenti`, che non possono essere garanti;
+        - le cattedre con TAF non usati nelle funzioni obiettivo (`TAF_OBIETTIVO`), tranne una per docente
+          e corso se il docente non vi ha cattedre con questi TAF: `main.lp` deriva dalle cattedre i
+          candidati garanti (`candidato/3`), che restano quindi gli stessi.
+
+        :param cattedre: DataFrame delle cattedre.
+        :type cattedre: pandas.DataFrame
+        :return: DataFrame delle cattedre ridotto.
+        :rtype: pandas.DataFrame
+        """
+        cattedre = cattedre[cattedre["matricola"].isin(self.docenti["matricola"])]
+        cattedre = cattedre.drop_duplicates(subset=["codice", "matricola", "tipo", "taf"])
+
+        obiettivo = cattedre["taf"].isin(self.TAF_OBIETTIVO)
+        coppia_con_obiettivo = obiettivo.groupby([cattedre["codice"], cattedre["matricola"]]).transform("any")
+        prima_della_coppia = ~cattedre.duplicated(subset=["codice", "matricola"])
+        return cattedre[obiettivo | (~coppia_con_obiettivo & prima_della_coppia)]
+
+    def normalizza_docenti(self, df):
+        """
+        Deriva, con operazioni vettoriali, le colonne normalizzate dei docenti usate per generare i fatti ASP.
+
+        Le colonne calcolate sono:
+        - `matricola`: matricola del docente come stringa di un intero (NaN se assente);
+        - `nome`: cognome e nome del docente;
+        - `settore`: settore dell'SSD in minuscolo e senza trattini (es. "inf");
+        - `numero`: numero dell'SSD come intero (es. 1 per "INF/01");
+        - `fascia`: 'td' per i ricercatori, 'ti' per tutti gli altri.
+
+        La tabella derivata viene salvata in `self.docenti` per poter essere riutilizzata dagli altri metodi di scrittura.
+
+        :param df: DataFrame contenente i dati relativi ai docenti.
+        :type df: pandas.DataFrame
+        :return: DataFrame con le colonne normalizzate, nello stesso ordine delle righe in ingresso.
+        :rtype: pandas.DataFrame
+        """
+        ssd = df['SSD'].str.split('/')
+        matricola = df['Matricola'].where((df['Matricola'] != '') & (df['Matricola'].str.lower() != 'nan'))
+
+        self.docenti = pd.DataFrame({
+            "matricola": matricola.astype(float).astype("Int64").astype(str).where(matricola.notna()),
+            "nome": df['Cognome e Nome'],
+            # Non posso usare le lettere in maiuscolo perchè possono essere scambiate per variabili e non atomi
+            "settore": ssd.str[0].str.lower().str.replace('-', ''),
+            "numero": ssd.str[1].astype(int),
+            "fascia": df['Fascia'].str.lower().str.contains('ricercatore', regex=False).map({True: 'td', False: 'ti'})
+        }, index=df.index)
+        return self.docenti
+
     def scrivi_docenti(self, df, filename):
         """
         Genera un file ASP contenente informazioni sui docenti.
 
+        Le colonne normalizzate vengono derivate una sola volta tramite `normalizza_docenti`
+        e tutte le sezioni del file sono calcolate a partire da esse.
+
         :param df: DataFrame contenente i dati relativi ai docenti.
         :type df: pandas.DataFrame
         :param filename: Nome del file di output (senza estensione).
@@ -312,109 +554,97 @@ class DatasetManager:
         :raises Exception: Se si verifica un errore durante la scrittura del file.
         """
         # Crea la cartella 'lp' se non esiste
-        output_dir = 'lp'
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
         comment_character = '% '
-        # filepath = os.path.join(self.dataset_path, filename + '.lp')
-        filepath = os.path.join(output_dir, filename + '.lp')
-
-        # Set per tracciare valori già scritti
-        docenti_aggiunti = set()
-        ssd_aggiunti = set()
-        fascia_aggiunti = set()
+        filepath = self._percorso(filename)
 
         try:
-            with open(filepath, 'w') as file:
+            docenti = self.normalizza_docenti(df)
+
+            if docenti["matricola"].isna().any():
+                raise Exception("Matricola non trovata")
+
+            def calcola(righe):
+                # Ogni docente viene scritto una sola volta, con i dati della sua prima riga
+                docenti_unici = righe.drop_duplicates(subset="matricola")
+                commenti = (
+                    f"{comment_character} " + docenti_unici["nome"] + " (" + docenti_unici["matricola"]
+                    + "), SSD caratterizzante: " + docenti_unici["settore"] + "/" + docenti_unici["numero"].astype(str) + "\n"
+                )
+                # SSD e fasce: ripetuti nei frammenti di più docenti, vengono scritti una sola volta
+                settori = righe.drop_duplicates(subset=["matricola", "settore"])
+                fasce = righe.drop_duplicates(subset=["matricola", "fascia"])
+                return _raggruppa({
+                    "ssd": (settori["matricola"], settori["_riga"], "ssd(" + settori["settore"] + ").\n"),
+                    "fasce": (fasce["matricola"], fasce["_riga"], "fascia(" + fasce["fascia"] + ").\n"),
+                    "docenti": (docenti_unici["matricola"], docenti_unici["_riga"],
+                                commenti + "matricola_docente(" + docenti_unici["matricola"] + ").\n"),
+                    "docenti_ssd": (docenti_unici["matricola"], docenti_unici["_riga"], (
+                        commenti + "docente(" + docenti_unici["matricola"] + ", " + docenti_unici["fascia"] + ", "
+                        + docenti_unici["settore"] + ") :- matricola_docente(" + docenti_unici["matricola"] + "), fascia("
+                        + docenti_unici["fascia"] + "), ssd(" + docenti_unici["settore"] + ").\n"
+                    ))
+                })
+
+            frammenti = self._frammenti("docenti", docenti, "matricola", calcola)
+
+            with self._apri(filename) as file:
 
                 # Scrive la sezione dei vari SSD
                 file.write(f"{comment_character} SEZIONE: SSD\n")
-                for _, row in df.iterrows():
-                    # Non posso usare le lettere in maiuscolo perchè possono essere scambiate per variabili e non atomi
-                    ssd = row['SSD'].split('/')
-                    settore = ssd[0].lower()
-                    settore = settore.replace('-', '')
-                    numero = int(ssd[1])
-                    
-                    # ssd = str(ssd)
-                    # if ssd not in ssd_aggiunti:
-                    if settore not in ssd_aggiunti:
-                        file.write(f"ssd({settore}).\n")
-                        ssd_aggiunti.add(settore)
-                        
+                file.writelines(_unisci(frammenti, "ssd", uniche=True))
                 file.write("\n")
 
                 # Scrive la sezione delle fasce dei contratti
                 file.write(f"{comment_character} SEZIONE: FASCIE\n")
-                for _, row in df.iterrows():
-                    fascia = row['Fascia']
-                    if 'ricercatore' in fascia.lower():
-                        fascia = 'td'
-                    else:
-                        fascia = 'ti'
-
-                    if fascia not in fascia_aggiunti:
-                        file.write(f"fascia({fascia}).\n")
-                        fascia_aggiunti.add(fascia)
+                file.writelines(_unisci(frammenti, "fasce", uniche=True))
                 file.write("\n")
 
                 # Scrive la sezione dei docenti
                 file.write(f"{comment_character} SEZIONE: Docenti\n")
-                for _, row in df.iterrows():
-                    if not row['Matricola'] or row['Matricola'] is None or row['Matricola'].lower() == 'nan':
-                        continue
-                    else:
-                        matricola_docente = int(float(row['Matricola']))
-                    
-                    ssd = row['SSD'].split('/')
-                    settore = ssd[0].lower()
-                    settore = settore.replace('-', '')
-                    numero = int(ssd[1])
-                    ssd = str(ssd)
-
-                    nome_docente = row['Cognome e Nome']
-
-                    if matricola_docente not in docenti_aggiunti:
-                        file.write(f"{comment_character} {nome_docente} ({matricola_docente}), SSD caratterizzante: {settore}/{numero}\n")
-                        file.write(f"matricola_docente({matricola_docente}).\n")
-                        docenti_aggiunti.add(matricola_docente)
-                docenti_aggiunti = set() # reset docenti aggiunti
+                file.writelines(_unisci(frammenti, "docenti"))
                 file.write("\n")
-                
+
                 # Scrive la sezione dei docenti
                 file.write(f"{comment_character} SEZIONE: SSD caratterizzante dei docenti\n")
-                for _, row in df.iterrows():
-                    if not row['Matricola'] or row['Matricola'] is None or row['Matricola'].lower() == 'nan':
-                        raise Exception("Matricola non trovata")
-                        continue
-                    else:
-                        matricola_docente = int(float(row['Matricola']))
-                    
-                    fascia = row['Fascia']
-                    if 'ricercatore' in fascia.lower():
-                        fascia = 'td'
-                    else:
-                        fascia = 'ti'
-
-                    ssd = row['SSD'].split('/')
-                    settore = ssd[0].lower()
-                    settore = settore.replace('-', '')
-                    numero = int(ssd[1])
-                    ssd = str(ssd)
-
-                    nome_docente = row['Cognome e Nome']
-
-                    if matricola_docente not in docenti_aggiunti:
-                        file.write(f"{comment_character} {nome_docente} ({matricola_docente}), SSD caratterizzante: {settore}/{numero}\n")
-                        file.write(f"docente({matricola_docente}, {fascia}, {settore}) :- matricola_docente({matricola_docente}), fascia({fascia}), ssd({settore}).\n")
-                        docenti_aggiunti.add(matricola_docente)
+                file.writelines(_unisci(frammenti, "docenti_ssd"))
                 file.write("\n")
-
-            print(f"Dati salvati con successo in: {filepath}")
         except Exception as e:
             raise Exception(f"Errore durante il salvataggio dei dati su '{filepath}': {e}")
         
+    def scrivi_warm_start(self, df, filename):
+        """
+        Genera un file ASP con le euristiche per partire da un'assegnazione precedente
+        (ad esempio il file `garanti.xlsx` prodotto da `utils/post-proc.py` l'anno precedente).
+
+        Per ogni coppia (docente, corso) della soluzione precedente viene scritta una direttiva
+        `#heuristic` che fa scegliere per prima, e come vera, l'assegnazione del docente come garante
+        del corso, se è ancora un candidato. Le direttive sono usate solo con `--heuristic=Domain`.
+
+        :param df: DataFrame con le colonne "Matricole" e "Codice Corso" della soluzione precedente.
+        :type df: pandas.DataFrame
+        :param filename: Nome del file di output (senza estensione).
+        :type filename: str
+        :raises Exception: Se si verifica un errore durante la scrittura del file.
+        """
+        comment_character = '% '
+        filepath = self._percorso(filename)
+
+        try:
+            precedenti = pd.DataFrame({
+                "matricola": df["Matricole"].astype(float).astype(int).astype(str),
+                "codice": df["Codice Corso"].astype(float).astype(int).astype(str)
+            }).drop_duplicates()
+
+            with self._apri(filename) as file:
+                file.write(f"{comment_character} SEZIONE: Garanti della soluzione precedente (docente, corso)\n")
+                file.writelines((
+                    "#heuristic garante(" + precedenti["matricola"] + ", " + precedenti["codice"] + ", Peso, Fascia) : candidato("
+                    + precedenti["matricola"] + ", " + precedenti["codice"] + ", Fascia), peso(Peso). [1, true]\n"
+                ).tolist())
+                file.write("\n")
+        except Exception as e:
+            raise Exception(f"Errore durante il salvataggio dei dati su '{filepath}': {e}")
+
     def scrivi_docenti_a_contratto(self, df, filename):
         """
         Genera un file ASP contenente informazioni sui docenti a contratto.
@@ -428,19 +658,14 @@ class DatasetManager:
         SKIP = True
 
         # Crea la cartella 'lp' se non esiste
-        output_dir = 'lp'
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
         comment_character = '% '
-        # filepath = os.path.join(self.dataset_path, filename + '.lp')
-        filepath = os.path.join(output_dir, filename + '.lp')
+        filepath = self._percorso(filename)
 
         # Set per tracciare valori già scritti
         docenti_aggiunti = set()
 
         try:
-            with open(filepath, 'w') as file:
+            with self._apri(filename) as file:
 
                 # Scrive la sezione delle fasce dei contratti
                 file.write(f"{comment_character} SEZIONE: FASCIE\n")
@@ -468,7 +693,5 @@ class DatasetManager:
                             docenti_aggiunti.add(matricola_docente)
                     docenti_aggiunti = set() # reset docenti aggiunti
                     file.write("\n")        
-
-            print(f"Dati salvati con successo in: {filepath}")
         except Exception as e:
             raise Exception(f"Errore durante il salvataggio dei dati su '{filepath}': {e}")
\ No newline at end of file
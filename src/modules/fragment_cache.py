@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+class FragmentCache:
+    """
+    Classe per la gestione di una cache persistente dei frammenti dei programmi ASP generati da `DatasetManager`.
+
+    Un frammento contiene le righe di un programma prodotte da un gruppo di righe del dataset (ad esempio
+    tutte le coperture di un corso, o le righe di un docente), suddivise per sezione del file. La chiave di
+    un frammento è l'hash del contenuto delle sue righe, del contesto della generazione e della versione
+    del generatore: un frammento viene quindi ricalcolato solo quando cambiano i dati da cui dipende, e
+    un programma per cento corsi che differisce dal precedente per un solo corso ricalcola un solo frammento.
+
+    Ogni frammento è un file JSON nella cartella del proprio tipo di programma, così salvare un frammento non
+    richiede di riscrivere gli altri; oltre `MAX_VOCI` frammenti per tipo vengono eliminati quelli usati meno
+    di recente (LRU, in base alla data di modifica, aggiornata a ogni lettura come in `ResultCache`).
+    I frammenti letti o salvati restano anche in memoria, per le generazioni successive dello stesso processo.
+    """
+
+    # Memo condiviso tra tutte le istanze: percorso del file -> frammento
+    _memo = dict()
+
+    # Numero massimo di frammenti salvati per tipo di programma
+    MAX_VOCI = 20000
+
+    def __init__(self, cache_dir="dataset/.cache/frammenti", versione=""):
+        """
+        Inizializza la cache dei frammenti.
+
+        :param cache_dir: Cartella in cui salvare i frammenti. Default: "dataset/.cache/frammenti".
+        :type cache_dir: str
+        :param versione: Versione del generatore, inclusa nelle chiavi: i frammenti generati da una
+                         versione diversa non vengono più usati. Default: "".
+        :type versione: str
+        """
+        self.cache_dir = cache_dir
+        self.versione = versione
+        self._modificati = set()
+
+    def chiavi(self, contesto, righe, gruppi):
+        """
+        Calcola la chiave del frammento di ogni gruppo di righe.
+
+        :param contesto: Parametri della generazione che influiscono sul frammento (es. il tipo di programma).
+        :type contesto: str
+        :param righe: DataFrame con le sole colonne da cui dipendono i frammenti.
+        :type righe: pandas.DataFrame
+        :param gruppi: Dizionario gruppo -> posizioni delle sue righe in `righe` (es. `groupby(...).indices`).
+        :type gruppi: dict
+        :return: Dizionario gruppo -> hash SHA-256 del frammento.
+        :rtype: dict
+        """
+        hash_righe = pd.util.hash_pandas_object(righe, index=False).to_numpy()
+        intestazione = "\0".join([self.versione, pd.__version__, contesto] + [str(c) for c in righe.columns])
+        chiavi = dict()
+        for gruppo, posizioni in gruppi.items():
+            sha = hashlib.sha256(f"{intestazione}\0{gruppo}\0".encode("utf-8"))
+            sha.update(hash_righe[posizioni].tobytes())
+            chiavi[gruppo] = sha.hexdigest()
+        return chiavi
+
+    def _percorso(self, tipo, chiave):
+        """
+        Restituisce il file del frammento associato alla chiave.
+        """
+        return os.path.join(self.cache_dir, tipo, chiave + ".json")
+
+    def leggi(self, tipo, chiave):
+        """
+        Restituisce il frammento associato alla chiave, aggiornandone l'istante di ultimo utilizzo.
+
+        :param tipo: Tipo di programma (es. "coperture").
+        :type tipo: str
+        :param chiave: Chiave del frammento (vedi `chiavi`).
+        :type chiave: str
+        :return: Il frammento, oppure None se non è presente o non è valido.
+        :rtype: dict
+        """
+        path = self._percorso(tipo, chiave)
+        if path in FragmentCache._memo:
+            try:
+                os.utime(path)
+            except OSError:
+                # Eliminato da un altro processo: il frammento in memoria resta comunque valido
+                pass
+            return FragmentCache._memo[path]
+        try:
+            with open(path) as f:
+                frammento = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Attenzione: frammento in cache non valido per '{tipo}', verrà ricalcolato. {e}")
+            return None
+        FragmentCache._memo[path] = frammento
+        return frammento
+
+    def salva(self, tipo, chiave, frammento):
+        """
+        Salva su disco, in modo atomico, un frammento; i meno recenti vengono eliminati da `scrivi`.
+
+        :param tipo: Tipo di programma (es. "coperture").
+        :type tipo: str
+        :param chiave: Chiave del frammento (vedi `chiavi`).
+        :type chiave: str
+        :param frammento: Frammento, serializzabile in JSON.
+        :type frammento: dict
+        """
+        path = self._percorso(tipo, chiave)
+        FragmentCache._memo[path] = frammento
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # File temporaneo distinto per processo: più processi possono salvare insieme (vedi hard-tester.py)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(frammento, f)
+            os.replace(tmp_path, path)
+            self._modificati.add(tipo)
+        except OSError as e:
+            print(f"Attenzione: impossibile salvare il frammento in cache. {e}")
+
+    def scrivi(self, tipo):
+        """
+        Elimina i frammenti usati meno di recente di un tipo di programma oltre `MAX_VOCI`, se ne sono
+        stati salvati di nuovi.
+
+        :param tipo: Tipo di programma (es. "coperture").
+        :type tipo: str
+        """
+        if tipo not in self._modificati:
+            return
+        self._modificati.discard(tipo)
+
+        cartella = os.path.join(self.cache_dir, tipo)
+        voci = list()
+        try:
+            with os.scandir(cartella) as elementi:
+                for elemento in elementi:
+                    if elemento.name.endswith(".json"):
+                        try:
+                            voci.append((elemento.stat().st_mtime_ns, elemento.path))
+                        except OSError:
+                            continue
+        except OSError as e:
+            print(f"Attenzione: impossibile leggere i frammenti in cache. {e}")
+            return
+
+        for _, path in sorted(voci)[:max(0, len(voci) - self.MAX_VOCI)]:
+            FragmentCache._memo.pop(path, None)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
@@ -0,0 +1,203 @@
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from modules.solver import Solver
+
+def _esegui_configurazione(programmi, nome, configurazione, models, time_limit):
+    """
+    Risolve i programmi con una configurazione del portfolio.
+    Viene eseguita nei processi del pool di `Portfolio.esegui`.
+    """
+    solver = Solver(models=models, threads=1, time_limit=time_limit,
+                    heuristic=configurazione.get("heuristic"), options=configurazione.get("options"))
+    risultato = solver.aggiungi_fatti(programmi).risolvi()
+    return {
+        "configurazione": nome,
+        "stato": risultato.stato,
+        "costo": risultato.costo,
+        "modelli": risultato.modelli,
+        "tempo_risoluzione": risultato.tempo_risoluzione,
+        "tempo_primo_modello": risultato.tempo_primo_modello,
+        "tempo_ultimo_modello": risultato.tempo_ultimo_modello
+    }
+
+class Portfolio:
+    """
+    Classe per confrontare più configurazioni di clingo sulla stessa istanza.
+
+    Ogni configurazione viene eseguita in un processo separato con un solo thread e lo stesso
+    limite di tempo; la configurazione migliore è quella che dimostra l'ottimo nel minor tempo
+    oppure, se nessuna ci riesce, quella che trova il costo migliore (a parità, per prima).
+    La configurazione vincente viene salvata in un profilo associato ai corsi dell'istanza e
+    riutilizzata automaticamente dalle risoluzioni successive degli stessi corsi, anche se i fatti
+    sono stati generati di nuovo (es. `main.py --solve` dopo `benchmark.py --portfolio`).
+    """
+
+    # Corsi di un programma generato dal DatasetManager o di un dataset di benchmark
+    CODICE_CORSO = re.compile(r"codice_corso\((\d+)\)")
+
+    # Configurazioni provate: euristica (--heuristic) e opzioni aggiuntive di clingo
+    CONFIGURAZIONI = {
+        "default": {"heuristic": "Domain", "options": []},
+        "frumpy": {"heuristic": "Domain", "options": ["--configuration=frumpy"]},
+        "jumpy": {"heuristic": "Domain", "options": ["--configuration=jumpy"]},
+        "tweety": {"heuristic": "Domain", "options": ["--configuration=tweety"]},
+        "handy": {"heuristic": "Domain", "options": ["--configuration=handy"]},
+        "crafty": {"heuristic": "Domain", "options": ["--configuration=crafty"]},
+        "trendy": {"heuristic": "Domain", "options": ["--configuration=trendy"]},
+        "bb-hier": {"heuristic": "Domain", "options": ["--opt-strategy=bb,hier"]},
+        "bb-dec": {"heuristic": "Domain", "options": ["--opt-strategy=bb,dec"]},
+        "usc-oll": {"heuristic": "Domain", "options": ["--opt-strategy=usc,oll"]},
+        "usc-k": {"heuristic": "Domain", "options": ["--opt-strategy=usc,k"]},
+        "usc-pmres": {"heuristic": "Domain", "options": ["--opt-strategy=usc,pmres"]},
+        "usc-oll-shrink": {"heuristic": "Domain", "options": ["--opt-strategy=usc,oll", "--opt-usc-shrink=bin"]},
+        "vsids": {"heuristic": "Vsids", "options": []},
+        "berkmin": {"heuristic": "Berkmin", "options": []},
+        "vsids-sign": {"heuristic": "Vsids", "options": ["--opt-heuristic=sign"]}
+    }
+
+    def __init__(self, configurazioni=None, time_limit=60, workers=None, profili_path="dataset/.cache/portfolio.json"):
+        """
+        Inizializza il portfolio.
+
+        :param configurazioni: Nomi delle configurazioni da provare (chiavi di `CONFIGURAZIONI`). Default: tutte.
+        :type configurazioni: list
+        :param time_limit: Limite di tempo in secondi per ogni configurazione. Default: 60.
+        :type time_limit: int
+        :param workers: Numero di configurazioni eseguite in parallelo. Default: numero di CPU.
+        :type workers: int
+        :param profili_path: File JSON con le configurazioni migliori per istanza.
+                             Default: "dataset/.cache/portfolio.json".
+        :type profili_path: str
+        """
+        nomi = configurazioni or list(self.CONFIGURAZIONI.keys())
+        for nome in nomi:
+            if nome not in self.CONFIGURAZIONI:
+                raise ValueError(f"Configurazione '{nome}' non valida. Configurazioni disponibili: {', '.join(self.CONFIGURAZIONI)}")
+        self.configurazioni = nomi
+        self.time_limit = time_limit
+        self.workers = workers
+        self.profili_path = profili_path
+
+    @classmethod
+    def chiave(cls, programmi):
+        """
+        Calcola l'identificativo di un'istanza: l'elenco ordinato dei codici dei corsi (`codice_corso/1`).
+
+        Non dipende dal testo dei programmi, che cambia a ogni modifica del generatore o dei dati
+        (es. un docente in più), così lo stesso insieme di corsi ritrova il proprio profilo sia dai
+        fatti generati da `main.py` sia dai dataset di `benchmark/`.
+
+        :param programmi: Dizionario nome -> testo dei programmi ASP (es. `DatasetManager.programmi`).
+        :type programmi: dict
+        :return: Codici dei corsi separati da virgole (es. "3027,5069").
+        :rtype: str
+        """
+        corsi = set()
+        for testo in programmi.values():
+            corsi.update(cls.CODICE_CORSO.findall(testo))
+        return ",".join(sorted(corsi, key=int))
+
+    @staticmethod
+    def _ordinamento(riga):
+        """
+        Chiave di ordinamento delle esecuzioni: prima gli ottimi dimostrati per tempo, poi gli
+        altri risultati per costo e istante dell'ultimo modello.
+        """
+        if riga["stato"] == "OPTIMUM FOUND":
+            return (0, [], riga["tempo_risoluzione"])
+        if riga["modelli"]:
+            return (1, riga["costo"], riga["tempo_ultimo_modello"])
+        return (2, [], 0)
+
+    def esegui(self, programmi):
+        """
+        Esegue tutte le configurazioni sui programmi indicati e salva il profilo della migliore.
+
+        :param programmi: Dizionario nome -> testo dei programmi ASP.
+        :type programmi: dict
+        :return: Esecuzioni ordinate dalla migliore alla peggiore.
+        :rtype: list
+        """
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(_esegui_configurazione, programmi, nome, self.CONFIGURAZIONI[nome], 0, self.time_limit)
+                for nome in self.configurazioni
+            ]
+            righe = sorted((future.result() for future in futures), key=self._ordinamento)
+
+        if righe and righe[0]["modelli"]:
+            self.salva_profilo(programmi, righe[0])
+        return righe
+
+    @staticmethod
+    def stampa(righe):
+        """
+        Stampa la tabella delle esecuzioni restituita da `esegui`, dalla migliore alla peggiore.
+
+        :param righe: Esecuzioni restituite da `esegui`.
+        :type righe: list
+        """
+        formatta = lambda t: "-" if t is None else f"{t:.3f}"
+        print(f"{'Configurazione':<16} {'Stato':<14} {'Tempo':>8} {'1° mod.':>8} {'Ottimo':>8}  Costo")
+        for r in righe:
+            ottimo = r["tempo_ultimo_modello"] if r["stato"] == "OPTIMUM FOUND" else None
+            print(f"{r['configurazione']:<16} {r['stato']:<14} {formatta(r['tempo_risoluzione']):>8} "
+                  f"{formatta(r['tempo_primo_modello']):>8} {formatta(ottimo):>8}  {r['costo']}")
+        if righe:
+            print(f"Configurazione migliore: {righe[0]['configurazione']}")
+
+    def _leggi_profili(self):
+        """
+        Legge i profili salvati, restituendo un dizionario vuoto se il file non esiste o non è valido.
+        """
+        if not self.profili_path or not os.path.exists(self.profili_path):
+            return dict()
+        try:
+            with open(self.profili_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Attenzione: profili del portfolio non validi. {e}")
+            return dict()
+
+    def salva_profilo(self, programmi, riga):
+        """
+        Salva la configurazione vincente come profilo dell'istanza.
+
+        :param programmi: Programmi ASP dell'istanza.
+        :type programmi: dict
+        :param riga: Esecuzione della configurazione vincente.
+        :type riga: dict
+        """
+        if not self.profili_path:
+            return
+        profili = self._leggi_profili()
+        nome = riga["configurazione"]
+        chiave = self.chiave(programmi)
+        # L'ordine del file è quello di salvataggio: l'ultimo profilo è il più recente (vedi `profilo`)
+        profili.pop(chiave, None)
+        profili[chiave] = dict(self.CONFIGURAZIONI[nome], nome=nome, stato=riga["stato"],
+                                               tempo=riga["tempo_risoluzione"], costo=riga["costo"])
+        os.makedirs(os.path.dirname(self.profili_path) or ".", exist_ok=True)
+        tmp_path = f"{self.profili_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(profili, f, indent=4)
+        os.replace(tmp_path, self.profili_path)
+
+    def profilo(self, programmi):
+        """
+        Restituisce la configurazione migliore salvata per i corsi dell'istanza. Se i corsi non hanno un
+        profilo viene restituito, segnalandolo, il profilo salvato più di recente.
+
+        :param programmi: Programmi ASP dell'istanza.
+        :type programmi: dict
+        :return: Dizionario con "nome", "heuristic" e "options", oppure None se non ci sono profili.
+        :rtype: dict
+        """
+        profili = self._leggi_profili()
+        profilo = profili.get(self.chiave(programmi))
+        if profilo is None and profili:
+            profilo = list(profili.values())[-1]
+            print(f"Nessun profilo del portfolio per questi corsi: uso il profilo salvato più di recente ({profilo['nome']})")
+        return profilo
@@ -0,0 +1,173 @@
+import json
+import os
+import numpy as np
+from fuzzywuzzy import fuzz, utils
+
+class PresidentMatcher:
+    """
+    Classe per l'abbinamento fuzzy dei nomi dei docenti ai presidenti dei corsi di studio.
+
+    Restituisce lo stesso risultato di `process.extractOne(nome, presidenti, scorer=fuzz.token_sort_ratio)`
+    con una soglia minima sul punteggio, ma evita di confrontare ogni riga con tutti i presidenti:
+    - i nomi ripetuti vengono abbinati una sola volta;
+    - i nomi che, normalizzati, coincidono con un presidente vengono abbinati tramite hash;
+    - per gli altri nomi viene calcolata in blocco, con NumPy, una matrice di limiti superiori al
+      punteggio (basata sul numero di caratteri in comune) e lo scorer viene eseguito solo sulle
+      coppie che possono superare la soglia;
+    - i punteggi calcolati vengono memorizzati, anche su disco, per le esecuzioni successive.
+    """
+
+    # Memo condiviso tra tutte le istanze: (nome normalizzato, presidente normalizzato) -> punteggio
+    _memo = dict()
+
+    # Numero di nomi per blocco nel calcolo della matrice dei limiti superiori
+    BLOCCO = 1024
+
+    def __init__(self, threshold=90, cache_path="dataset/.cache/presidenti.json"):
+        """
+        Inizializza l'abbinatore.
+
+        :param threshold: Punteggio minimo (0-100) perché un presidente venga abbinato. Default: 90.
+        :type threshold: int
+        :param cache_path: File in cui salvare i punteggi calcolati. Default: "dataset/.cache/presidenti.json".
+                           Se None, i punteggi vengono mantenuti solo in memoria.
+        :type cache_path: str
+        """
+        self.threshold = threshold
+        self.cache_path = cache_path
+        self._modificato = False
+        self._carica_memo()
+
+    @staticmethod
+    def normalizza(testo):
+        """
+        Normalizza un nome come `process.extractOne` con lo scorer `fuzz.token_sort_ratio`:
+        caratteri non ASCII e non alfanumerici rimossi, minuscolo, token ordinati alfabeticamente.
+
+        :param testo: Nome da normalizzare.
+        :type testo: str
+        :return: Nome normalizzato.
+        :rtype: str
+        """
+        return " ".join(sorted(utils.full_process(testo, force_ascii=True).split()))
+
+    def abbina(self, nomi, presidenti):
+        """
+        Abbina ogni nome al presidente più simile, se il punteggio raggiunge la soglia.
+
+        :param nomi: Nomi da abbinare (es. la colonna "Nome e Cognome" delle coperture).
+        :type nomi: list
+        :param presidenti: Nomi dei presidenti tra cui scegliere.
+        :type presidenti: list
+        :return: Lista, parallela a `nomi`, con il presidente abbinato oppure None.
+        :rtype: list
+        """
+        presidenti = list(presidenti)
+        chiavi_presidenti = [self.normalizza(p) for p in presidenti]
+
+        # Primo presidente per ogni nome normalizzato: a parità di punteggio extractOne sceglie il primo
+        esatti = dict()
+        for i, chiave in enumerate(chiavi_presidenti):
+            if chiave:
+                esatti.setdefault(chiave, i)
+
+        abbinati = dict()
+        da_confrontare = list()
+        for nome in dict.fromkeys(nomi):
+            chiave = self.normalizza(nome)
+            if chiave in esatti:
+                abbinati[nome] = presidenti[esatti[chiave]]
+            elif chiave and presidenti:
+                da_confrontare.append((nome, chiave))
+            else:
+                abbinati[nome] = None
+
+        if da_confrontare:
+            chiavi = [chiave for _, chiave in da_confrontare]
+            for (nome, chiave), candidati in zip(da_confrontare, self._candidati(chiavi, chiavi_presidenti)):
+                migliore, punteggio_migliore = None, -1
+                for j in candidati:
+                    punteggio = self._punteggio(chiave, chiavi_presidenti[j])
+                    if punteggio > punteggio_migliore:
+                        migliore, punteggio_migliore = j, punteggio
+                if migliore is not None and punteggio_migliore >= self.threshold:
+                    abbinati[nome] = presidenti[migliore]
+                else:
+                    abbinati[nome] = None
+
+        if self._modificato:
+            self._salva_memo()
+
+        return [abbinati[nome] for nome in nomi]
+
+    def _candidati(self, chiavi, chiavi_presidenti):
+        """
+        Restituisce, per ogni nome, gli indici dei presidenti che possono raggiungere la soglia.
+
+        Il punteggio di `fuzz.ratio` è 200 * M / (len(a) + len(b)), dove M non supera il numero di
+        caratteri in comune tra le due stringhe (contati con molteplicità): questo limite superiore
+        viene calcolato per tutte le coppie con un'unica operazione vettoriale.
+        """
+        alfabeto = {c: i for i, c in enumerate(sorted(set("".join(chiavi + chiavi_presidenti))))}
+        conteggi_presidenti = self._conteggi(chiavi_presidenti, alfabeto)
+        lunghezze_presidenti = conteggi_presidenti.sum(axis=1)
+
+        # Margine di mezzo punto per l'arrotondamento del punteggio all'intero
+        soglia = self.threshold - 0.5
+        for inizio in range(0, len(chiavi), self.BLOCCO):
+            conteggi = self._conteggi(chiavi[inizio:inizio + self.BLOCCO], alfabeto)
+            comuni = np.minimum(conteggi[:, None, :], conteggi_presidenti[None, :, :]).sum(axis=2)
+            totali = conteggi.sum(axis=1)[:, None] + lunghezze_presidenti[None, :]
+            limiti = 200 * comuni / np.maximum(totali, 1)
+            for riga in limiti:
+                yield np.flatnonzero(riga >= soglia)
+
+    @staticmethod
+    def _conteggi(chiavi, alfabeto):
+        """
+        Restituisce la matrice (nomi x alfabeto) con le occorrenze di ogni carattere.
+        """
+        conteggi = np.zeros((len(chiavi), len(alfabeto)), dtype=np.int32)
+        for i, chiave in enumerate(chiavi):
+            for c in chiave:
+                conteggi[i, alfabeto[c]] += 1
+        return conteggi
+
+    def _punteggio(self, chiave, chiave_presidente):
+        """
+        Calcola, o recupera dalla memoria, il punteggio tra due nomi normalizzati.
+        """
+        coppia = f"{chiave}\t{chiave_presidente}"
+        if coppia not in PresidentMatcher._memo:
+            PresidentMatcher._memo[coppia] = fuzz.ratio(chiave, chiave_presidente)
+            self._modificato = True
+        return PresidentMatcher._memo[coppia]
+
+    def _carica_memo(self):
+        """
+        Carica i punteggi salvati su disco nelle esecuzioni precedenti.
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as f:
+                PresidentMatcher._memo.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Attenzione: cache dei presidenti non valida, verrà ricalcolata. {e}")
+
+    def _salva_memo(self):
+        """
+        Salva su disco, in modo atomico, i punteggi calcolati.
+        """
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            # File temporaneo distinto per processo: più processi possono salvare insieme (vedi hard-tester.py)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(PresidentMatcher._memo, f)
+            os.replace(tmp_path, self.cache_path)
+            self._modificato = False
+        except OSError as e:
+            print(f"Attenzione: impossibile salvare la cache dei presidenti. {e}")
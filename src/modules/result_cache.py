@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import clingo
+
+class ResultCache:
+    """
+    Classe per la gestione di una cache persistente dei risultati del solver.
+
+    Ogni voce è indirizzata dal contenuto dell'istanza: la chiave è l'hash dei programmi ASP
+    normalizzati (commenti e righe vuote rimossi), dell'encoding e delle opzioni di clingo, così
+    la stessa istanza generata due volte (es. `main.py --3027 --5069 --solve` ripetuto o
+    `hard-tester.py` che riprova lo stesso corso) viene risolta una sola volta.
+    Il valore è lo stato finale, il costo, gli atomi mostrati del miglior modello e le statistiche.
+
+    Le voci sono file JSON nella cartella della cache; quando la dimensione complessiva supera il
+    limite vengono eliminate le voci usate meno di recente (LRU, in base alla data di modifica,
+    aggiornata a ogni lettura).
+    """
+
+    # Stati che non vengono salvati: la risoluzione non ha prodotto alcuna informazione
+    STATI_ESCLUSI = ["UNKNOWN"]
+
+    def __init__(self, cache_dir="dataset/.cache/risultati", max_bytes=256 * 1024 * 1024):
+        """
+        Inizializza la cache dei risultati.
+
+        :param cache_dir: Cartella in cui salvare i risultati. Default: "dataset/.cache/risultati".
+        :type cache_dir: str
+        :param max_bytes: Dimensione massima complessiva delle voci in byte. Default: 256 MB.
+        :type max_bytes: int
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def normalizza(testo):
+        """
+        Normalizza un programma ASP rimuovendo commenti di riga, righe vuote e spazi superflui.
+
+        :param testo: Testo del programma.
+        :type testo: str
+        :return: Testo normalizzato.
+        :rtype: str
+        """
+        righe = (riga.strip() for riga in testo.splitlines())
+        return "\n".join(riga for riga in righe if riga and not riga.startswith("%"))
+
+    def chiave(self, encoding, programmi, argomenti):
+        """
+        Calcola la chiave di un'istanza.
+
+        :param encoding: Testo dell'encoding (es. `main.lp`).
+        :type encoding: str
+        :param programmi: Lista di testi dei programmi ASP aggiunti all'encoding.
+        :type programmi: list
+        :param argomenti: Argomenti del Control di clingo (vedi `Solver.argomenti`).
+        :type argomenti: list
+        :return: Hash SHA-256 dell'istanza.
+        :rtype: str
+        """
+        sha = hashlib.sha256()
+        sha.update(clingo.__version__.encode("utf-8") + b"\0")
+        sha.update("\0".join(argomenti).encode("utf-8") + b"\0")
+        sha.update(self.normalizza(encoding).encode("utf-8") + b"\0")
+        # L'ordine dei programmi non cambia l'istanza
+        for testo in sorted(self.normalizza(testo) for testo in programmi):
+            sha.update(testo.encode("utf-8") + b"\0")
+        return sha.hexdigest()
+
+    def _percorso(self, chiave):
+        """
+        Restituisce il file della voce associata alla chiave.
+        """
+        return os.path.join(self.cache_dir, chiave + ".json")
+
+    def leggi(self, chiave):
+        """
+        Restituisce il risultato salvato per la chiave, aggiornandone l'istante di ultimo utilizzo.
+
+        :param chiave: Chiave dell'istanza (vedi `chiave`).
+        :type chiave: str
+        :return: Dizionario del risultato, oppure None se la voce non esiste o non è valida.
+        :rtype: dict
+        """
+        if not self.cache_dir:
+            return None
+        path = self._percorso(chiave)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                voce = json.load(f)
+            os.utime(path)
+            return voce
+        except (OSError, ValueError) as e:
+            print(f"Attenzione: risultato in cache non valido, verrà ricalcolato. {e}")
+            return None
+
+    def salva(self, chiave, voce):
+        """
+        Salva il risultato associato alla chiave ed elimina le voci meno recenti oltre il limite.
+
+        :param chiave: Chiave dell'istanza (vedi `chiave`).
+        :type chiave: str
+        :param voce: Dizionario del risultato, serializzabile in JSON.
+        :type voce: dict
+        """
+        if not self.cache_dir or voce.get("stato") in self.STATI_ESCLUSI:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._percorso(chiave)
+            # File temporaneo distinto per processo: più processi possono salvare insieme (vedi hard-tester.py)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(voce, f)
+            os.replace(tmp_path, path)
+            self._elimina_meno_recenti()
+        except OSError as e:
+            print(f"Attenzione: impossibile salvare il risultato in cache. {e}")
+
+    def _elimina_meno_recenti(self):
+        """
+        Elimina le voci usate meno di recente finché la dimensione della cache supera il limite.
+        """
+        voci = list()
+        for nome in os.listdir(self.cache_dir):
+            if nome.endswith(".json"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, nome))
+                    voci.append((stat.st_mtime_ns, stat.st_size, nome))
+                except OSError:
+                    continue
+
+        totale = sum(dimensione for _, dimensione, _ in voci)
+        for _, dimensione, nome in sorted(voci):
+            if totale <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, nome))
+                totale -= dimensione
+            except OSError:
+                continue
@@ -0,0 +1,455 @@
+import os
+import time
+import clingo
+from modules.dataset_manager import DatasetManager
+
+class RisultatoSolver:
+    """
+    Classe che raccoglie l'esito di una risoluzione eseguita tramite la classe Solver.
+    """
+
+    def __init__(self):
+        """
+        Inizializza un risultato vuoto.
+
+        Attributi:
+        - `stato`: "OPTIMUM FOUND", "SATISFIABLE", "UNSATISFIABLE" oppure "UNKNOWN" (come nell'output di clingo).
+        - `modelli`: Numero di modelli trovati.
+        - `costo`: Vettore di ottimizzazione dell'ultimo (miglior) modello trovato.
+        - `simboli`: Atomi mostrati (`#show`) dell'ultimo modello trovato, come stringhe.
+        - `statistiche`: Statistiche di clingo al termine della risoluzione.
+        - `tempo_grounding`, `tempo_risoluzione`: Durate in secondi delle due fasi.
+        - `tempo_primo_modello`, `tempo_ultimo_modello`: Istanti, in secondi dall'inizio della
+          risoluzione, in cui sono stati trovati il primo e l'ultimo modello (None se assenti).
+        - `da_cache`: True se il risultato è stato letto dalla cache dei risultati (vedi `ResultCache`).
+        """
+        self.stato = "UNKNOWN"
+        self.modelli = 0
+        self.costo = list()
+        self.simboli = list()
+        self.statistiche = dict()
+        self.tempo_grounding = 0.0
+        self.tempo_risoluzione = 0.0
+        self.tempo_primo_modello = None
+        self.tempo_ultimo_modello = None
+        self.da_cache = False
+
+    # Attributi salvati nella cache dei risultati
+    CAMPI = ["stato", "modelli", "costo", "simboli", "statistiche", "tempo_grounding", "tempo_risoluzione",
+             "tempo_primo_modello", "tempo_ultimo_modello"]
+
+    def come_dizionario(self):
+        """
+        Restituisce il risultato come dizionario serializzabile in JSON.
+
+        :return: Dizionario con gli attributi in `CAMPI`.
+        :rtype: dict
+        """
+        return {campo: getattr(self, campo) for campo in self.CAMPI}
+
+    @classmethod
+    def da_dizionario(cls, dati):
+        """
+        Ricostruisce un risultato dal dizionario restituito da `come_dizionario`.
+
+        :param dati: Dizionario del risultato.
+        :type dati: dict
+        :return: Il risultato ricostruito.
+        :rtype: RisultatoSolver
+        """
+        risultato = cls()
+        for campo in cls.CAMPI:
+            if campo in dati:
+                setattr(risultato, campo, dati[campo])
+        return risultato
+
+
+class Solver:
+    """
+    Classe per la risoluzione del problema dei garanti tramite l'API Python di clingo.
+
+    Sostituisce l'esecuzione del binario `clingo` (vedi `lazy-run.sh`): i fatti generati dal
+    DatasetManager vengono aggiunti direttamente al programma senza passare dal disco, il
+    grounding di `main.lp` viene eseguito una sola volta e i modelli vengono notificati
+    tramite una callback man mano che vengono trovati.
+
+    I programmi generati dal DatasetManager vengono aggiunti tramite il backend di clingo a partire
+    dalle istruzioni restituite da `DatasetManager.istruzioni`, senza che clingo ne analizzi il testo;
+    gli altri programmi (stringhe e file) vengono aggiunti come testo.
+    """
+
+    def __init__(self, encoding_path="main.lp", models=16, threads=None, time_limit=60, heuristic="Domain", options=None,
+                 cache=None):
+        """
+        Inizializza il solver con gli stessi parametri di `lazy-run.sh`.
+
+        :param encoding_path: Percorso del file con l'encoding ASP del problema. Default: "main.lp".
+        :type encoding_path: str
+        :param models: Numero massimo di modelli da calcolare (0 per tutti). Default: 16.
+        :type models: int
+        :param threads: Numero di thread (--parallel-mode). Default: numero di CPU meno 2.
+        :type threads: int
+        :param time_limit: Limite di tempo in secondi (0 o None per nessun limite). Default: 60.
+        :type time_limit: int
+        :param heuristic: Euristica di clingo (--heuristic). Default: "Domain".
+        :type heuristic: str
+        :param options: Lista di opzioni aggiuntive da passare a clingo (es. ["--opt-strategy=usc"]).
+        :type options: list
+        :param cache: Cache persistente dei risultati (vedi `ResultCache`). Se None, ogni chiamata
+                      a `risolvi` esegue grounding e risoluzione. Default: None.
+        :type cache: ResultCache
+        """
+        self.encoding_path = encoding_path
+        self.models = models
+        self.threads = threads if threads else max(1, (os.cpu_count() or 3) - 2)
+        self.time_limit = time_limit
+        self.heuristic = heuristic
+        self.options = list(options) if options else list()
+        self.cache = cache
+
+        # Programmi da aggiungere prima del grounding: lista di triple (nome, testo, generato dal DatasetManager)
+        self.programmi = list()
+
+    def argomenti(self):
+        """
+        Restituisce gli argomenti con cui viene creato il Control di clingo.
+
+        :return: Lista di argomenti nel formato della riga di comando di clingo.
+        :rtype: list
+        """
+        argomenti = [f"--models={self.models}", "--stats"]
+        if self.threads > 1:
+            argomenti.append(f"--parallel-mode={self.threads}")
+        if self.heuristic:
+            argomenti.append(f"--heuristic={self.heuristic}")
+        return argomenti + self.options
+
+    def aggiungi_fatti(self, programmi):
+        """
+        Aggiunge i fatti da risolvere insieme all'encoding.
+
+        :param programmi: Testo del programma ASP, oppure dizionario nome -> testo dei programmi generati
+                          dal DatasetManager (`DatasetManager.programmi`), aggiunti tramite il backend.
+                          Il testo viene invece aggiunto così com'è.
+        :type programmi: str | dict
+        :return: L'istanza stessa, per concatenare le chiamate.
+        :rtype: Solver
+        """
+        if isinstance(programmi, dict):
+            for nome, testo in programmi.items():
+                self.programmi.append((nome, testo, True))
+        else:
+            self.programmi.append(("fatti", programmi, False))
+        return self
+
+    def aggiungi_file(self, path):
+        """
+        Aggiunge il contenuto di un file ASP già presente su disco (es. un file di `lp/`).
+
+        :param path: Percorso del file da aggiungere.
+        :type path: str
+        :return: L'istanza stessa, per concatenare le chiamate.
+        :rtype: Solver
+        """
+        with open(path) as f:
+            self.programmi.append((os.path.basename(path), f.read(), False))
+        return self
+
+    def _control(self):
+        """
+        Crea il Control di clingo e carica l'encoding e tutti i programmi aggiunti.
+
+        Le istruzioni dei programmi generati vengono aggiunte tramite il backend prima di caricare l'encoding
+        e i programmi testuali: aprire il backend dopo aver letto l'encoding fa controllare a clingo le
+        direttive `#show` prima del grounding, con l'avviso spurio "no atoms over signature occur in program"
+        su `garante/4`. Il grounding (`_ground`) viene poi eseguito una sola volta su tutto il programma.
+        """
+        ctl = clingo.Control(self.argomenti())
+        regole, esterni, testi = list(), list(), list()
+        for _, testo, generato in self.programmi:
+            if generato:
+                regole_programma, esterni_programma, testo = DatasetManager.istruzioni(testo)
+                regole.extend(regole_programma)
+                esterni.extend(esterni_programma)
+            if testo:
+                testi.append(testo)
+        if regole or esterni:
+            self._aggiungi_istruzioni(ctl, regole, esterni)
+
+        ctl.load(self.encoding_path)
+        for testo in testi:
+            ctl.add("base", [], testo)
+        return ctl
+
+    @staticmethod
+    def _aggiungi_istruzioni(ctl, regole, esterni):
+        """
+        Aggiunge al Control, tramite il backend, le regole e gli atomi esterni restituiti da `DatasetManager.istruzioni`.
+
+        Il grounder non semplifica le regole aggiunte tramite il backend, neanche se i loro corpi sono fatti, e
+        non le considera fatti nelle regole di `main.lp`: le regole il cui corpo è composto solo da fatti vengono
+        quindi risolte prima (la loro testa diventa un fatto), così `main.lp` vede gli stessi fatti che vedrebbe
+        leggendo il testo. Le altre regole (es. quelle che dipendono da `attivo/1`, o da atomi definiti nei
+        programmi aggiunti come testo) vengono aggiunte come regole.
+        """
+        # Dizionari al posto di insiemi: l'ordine degli atomi, e quindi la ricerca, non dipende dall'hash delle stringhe
+        fatti = dict.fromkeys(testa for testa, corpo in regole if not corpo)
+        restanti = [(testa, corpo) for testa, corpo in regole if corpo and testa not in fatti]
+        while True:
+            nuovi = dict.fromkeys(testa for testa, corpo in restanti if all(atomo in fatti for atomo in corpo))
+            if not nuovi:
+                break
+            fatti.update(nuovi)
+            restanti = [(testa, corpo) for testa, corpo in restanti if testa not in fatti]
+
+        costanti = dict()
+        def simbolo(atomo):
+            nome, argomenti = atomo
+            for argomento in argomenti:
+                if argomento not in costanti:
+                    costanti[argomento] = clingo.Number(int(argomento)) if argomento.isdigit() else clingo.Function(argomento)
+            return clingo.Function(nome, [costanti[argomento] for argomento in argomenti])
+
+        with ctl.backend() as backend:
+            letterali = dict()
+            def letterale(atomo):
+                if atomo not in letterali:
+                    letterali[atomo] = backend.add_atom(simbolo(atomo))
+                return letterali[atomo]
+
+            for atomo in esterni:
+                backend.add_external(letterale(atomo), clingo.TruthValue.Free)
+            for atomo in fatti:
+                backend.add_rule([letterale(atomo)])
+            for testa, corpo in restanti:
+                backend.add_rule([letterale(testa)], [letterale(atomo) for atomo in corpo if atomo not in fatti])
+
+    def risolvi(self, on_model=None):
+        """
+        Esegue grounding e risoluzione, notificando ogni modello trovato.
+
+        Se è stata indicata una cache e contiene già il risultato della stessa istanza (stessi
+        programmi, encoding e opzioni), il risultato viene restituito senza eseguire clingo e
+        `on_model` viene chiamata una sola volta con il miglior modello salvato.
+
+        :param on_model: Funzione chiamata per ogni modello trovato, con il modello di clingo
+                         (None per i risultati dalla cache) e il RisultatoSolver parziale. Default: None.
+        :type on_model: callable
+        :return: Il risultato della risoluzione.
+        :rtype: RisultatoSolver
+        """
+        chiave = None
+        if self.cache is not None:
+            with open(self.encoding_path) as f:
+                encoding = f.read()
+            argomenti = self.argomenti() + [f"--time-limit={self.time_limit or 0}"]
+            chiave = self.cache.chiave(encoding, [testo for _, testo, _ in self.programmi], argomenti)
+            voce = self.cache.leggi(chiave)
+            if voce is not None:
+                risultato = RisultatoSolver.da_dizionario(voce)
+                risultato.da_cache = True
+                if on_model is not None and risultato.modelli:
+                    on_model(None, risultato)
+                return risultato
+
+        risultato = RisultatoSolver()
+        ctl = self._control()
+        self._ground(ctl, risultato)
+        risultato = self._solve(ctl, risultato, on_model)
+
+        if chiave is not None:
+            self.cache.salva(chiave, risultato.come_dizionario())
+        return risultato
+
+    def valuta(self, simboli):
+        """
+        Calcola il costo di una soluzione già nota (es. la risposta unita delle componenti) sul programma completo.
+
+        Gli atomi `garante/4` vengono fissati tramite assunzioni, veri quelli della soluzione e falsi tutti
+        gli altri: il programma ha quindi al più un modello, di cui viene restituito il costo. La cache dei
+        risultati non viene usata.
+
+        :param simboli: Atomi `garante/4` della soluzione, come stringhe (es. `RisultatoSolver.simboli`).
+        :type simboli: list
+        :return: Il risultato della risoluzione, "UNSATISFIABLE" se la soluzione non rispetta i vincoli del programma.
+        :rtype: RisultatoSolver
+        """
+        risultato = RisultatoSolver()
+        ctl = self._control()
+        self._ground(ctl, risultato)
+
+        scelti = set(simboli)
+        garanti = [atomo.symbol for atomo in ctl.symbolic_atoms.by_signature("garante", 4)]
+        if not scelti <= set(str(garante) for garante in garanti):
+            # La soluzione contiene garanti che il programma non può scegliere
+            risultato.stato = "UNSATISFIABLE"
+            return risultato
+
+        assumptions = [(garante, str(garante) in scelti) for garante in garanti]
+        return self._solve(ctl, risultato, assumptions=assumptions)
+
+    def _ground(self, ctl, risultato):
+        """
+        Esegue il grounding del programma base, registrandone la durata nel risultato.
+        """
+        inizio = time.perf_counter()
+        ctl.ground([("base", [])])
+        risultato.tempo_grounding = time.perf_counter() - inizio
+
+    def _solve(self, ctl, risultato, on_model=None, assumptions=None):
+        """
+        Esegue la risoluzione sul Control già istanziato, rispettando il limite di tempo.
+        """
+        inizio = time.perf_counter()
+
+        def gestisci_modello(model):
+            istante = time.perf_counter() - inizio
+            if risultato.tempo_primo_modello is None:
+                risultato.tempo_primo_modello = istante
+            risultato.tempo_ultimo_modello = istante
+            risultato.modelli += 1
+            risultato.costo = list(model.cost)
+            risultato.simboli = [str(simbolo) for simbolo in model.symbols(shown=True)]
+            if on_model is not None:
+                on_model(model, risultato)
+
+        with ctl.solve(assumptions=assumptions or [], on_model=gestisci_modello, async_=True) as handle:
+            if not handle.wait(self.time_limit if self.time_limit else None):
+                handle.cancel()
+            esito = handle.get()
+
+        risultato.tempo_risoluzione = time.perf_counter() - inizio
+        risultato.statistiche = ctl.statistics
+
+        if esito.unsatisfiable:
+            risultato.stato = "UNSATISFIABLE"
+        elif esito.satisfiable and esito.exhausted and risultato.costo:
+            risultato.stato = "OPTIMUM FOUND"
+        elif esito.satisfiable:
+            risultato.stato = "SATISFIABLE"
+
+        return risultato
+
+
+class SolverIncrementale(Solver):
+    """
+    Solver multi-shot per risolvere più sottoinsiemi di corsi sullo stesso programma.
+
+    I fatti devono essere generati con `DatasetManager(condizionale=True)`: ogni corso dipende
+    dall'atomo esterno `attivo(Corso)`. Il grounding viene eseguito una sola volta per tutti i
+    corsi e ogni chiamata a `risolvi` attiva i soli corsi richiesti tramite assunzioni, così
+    aggiungere o togliere un corso non richiede di rigenerare, rileggere e rifare il grounding
+    del programma e i nogood appresi nelle risoluzioni precedenti vengono riutilizzati.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Inizializza il solver con gli stessi parametri della classe Solver.
+        """
+        super().__init__(*args, **kwargs)
+        self.ctl = None
+        self.corsi = list()
+
+    def prepara(self):
+        """
+        Esegue, se non è già stato fatto, il grounding del programma con tutti i corsi.
+
+        :return: Il risultato con il solo tempo di grounding valorizzato.
+        :rtype: RisultatoSolver
+        """
+        risultato = RisultatoSolver()
+        if self.ctl is None:
+            self.ctl = self._control()
+            self._ground(self.ctl, risultato)
+            self.corsi = [atomo.symbol for atomo in self.ctl.symbolic_atoms.by_signature("attivo", 1)]
+        return risultato
+
+    def risolvi(self, attivi, on_model=None):
+        """
+        Risolve il problema considerando solo i corsi indicati.
+
+        :param attivi: Codici dei corsi da attivare; tutti gli altri corsi vengono disattivati.
+        :type attivi: list
+        :param on_model: Funzione chiamata per ogni modello trovato. Default: None.
+        :type on_model: callable
+        :return: Il risultato della risoluzione.
+        :rtype: RisultatoSolver
+        """
+        risultato = self.prepara()
+        attivi = set(str(codice) for codice in attivi)
+        assumptions = [(simbolo, str(simbolo.arguments[0]) in attivi) for simbolo in self.corsi]
+        return self._solve(self.ctl, risultato, on_model, assumptions)
+
+
+class SolverDiagnosi(Solver):
+    """
+    Solver per individuare la causa di un problema insoddisfacibile.
+
+    L'encoding viene istanziato in modalità diagnosi (`-c diagnosi=1`): ogni famiglia di vincoli
+    di ogni corso (minimo di docenti a tempo indeterminato, massimo a tempo determinato, numero di
+    garanti, affinità SSD, massimo di contratti) dipende da un atomo esterno `vincolo(Famiglia, Corso)`
+    attivato tramite assunzione. Se il problema è insoddisfacibile clingo restituisce un nucleo di
+    assunzioni incompatibili, che viene poi ridotto a un nucleo minimale (togliendo un vincolo non si
+    ottiene più un problema insoddisfacibile) riutilizzando lo stesso grounding.
+    """
+
+    def argomenti(self):
+        """
+        Restituisce gli argomenti del Control: la diagnosi cerca un solo modello e ignora l'ottimizzazione.
+        """
+        argomenti = [argomento for argomento in super().argomenti() if not argomento.startswith("--models=")]
+        return argomenti + ["--models=1", "--opt-mode=ignore", "--const=diagnosi=1"]
+
+    def diagnostica(self, minimizza=True):
+        """
+        Verifica se il problema è soddisfacibile e, in caso contrario, ne calcola il nucleo insoddisfacibile.
+
+        :param minimizza: Se True, riduce il nucleo restituito da clingo a un nucleo minimale. Default: True.
+        :type minimizza: bool
+        :return: Coppia (stato, nucleo): lo stato ("SATISFIABLE", "UNSATISFIABLE" o "UNKNOWN") e la lista
+                 ordinata delle coppie (famiglia di vincoli, codice del corso) del nucleo (vuota se il
+                 problema è soddisfacibile, oppure se è insoddisfacibile indipendentemente dai vincoli dei corsi).
+        :rtype: tuple
+        """
+        ctl = self._control()
+        self._ground(ctl, RisultatoSolver())
+
+        vincoli = [atomo.symbol for atomo in ctl.symbolic_atoms.by_signature("vincolo", 2) if atomo.is_external]
+        # Gli esterni sono falsi per default: vengono lasciati liberi, così valgono solo le assunzioni
+        for vincolo in vincoli:
+            ctl.assign_external(vincolo, None)
+        stato, nucleo = self._nucleo(ctl, vincoli)
+
+        if stato == "UNSATISFIABLE" and minimizza:
+            # Riduzione per eliminazione: un vincolo è necessario se senza di esso il problema diventa soddisfacibile
+            for vincolo in list(nucleo):
+                if vincolo not in nucleo:
+                    continue
+                ridotto = [v for v in nucleo if v != vincolo]
+                stato_ridotto, nucleo_ridotto = self._nucleo(ctl, ridotto)
+                if stato_ridotto == "UNSATISFIABLE":
+                    nucleo = [v for v in nucleo if v in nucleo_ridotto]
+
+        coppie = sorted((str(v.arguments[0]), str(v.arguments[1])) for v in nucleo)
+        return stato, coppie
+
+    def _nucleo(self, ctl, vincoli):
+        """
+        Risolve il problema con i soli vincoli indicati attivi.
+
+        :return: Coppia (stato, simboli dei vincoli nel nucleo restituito da clingo).
+        :rtype: tuple
+        """
+        letterali = {ctl.symbolic_atoms[v].literal: v for v in vincoli}
+
+        with ctl.solve(assumptions=[(v, True) for v in vincoli], async_=True) as handle:
+            if not handle.wait(self.time_limit if self.time_limit else None):
+                handle.cancel()
+            esito = handle.get()
+            nucleo = handle.core() if esito.unsatisfiable else list()
+
+        if esito.unsatisfiable:
+            return "UNSATISFIABLE", [letterali[l] for l in nucleo if l in letterali]
+        if esito.satisfiable:
+            return "SATISFIABLE", list()
+        return "UNKNOWN", list()
@@ -3,66 +3,83 @@ import pandas as pd
 import re
 
 file_path = "../dataset/originali/elenco_2024-2025.docx" 
-doc = Document(file_path)
+output_path = "../dataset/originali/elenco_2024-2025.xlsx"
 
-tabelle = []
-# Estrai tutte le tabelle dal documento
+def estrai_elenco(file_path, verbose=True):
+    """
+    Estrae l'elenco dei corsi di studio dalle tabelle del documento Word.
 
-for table in doc.tables:
-    tabella = []
-    for row in table.rows:
-        row = [cell.text.strip() for cell in row.cells]
-        tabella.append(row)
-    tabelle.append(tabella)
+    :param file_path: Percorso del file `.docx`.
+    :type file_path: str
+    :param verbose: Se True, stampa le tabelle e le righe lette.
+    :type verbose: bool
+    :return: DataFrame con una riga per corso di studio.
+    :rtype: pandas.DataFrame
+    """
+    log = print if verbose else (lambda *_: None)
+    doc = Document(file_path)
 
-# Lista per le righe da inserire nel DataFrame
-rows = []
+    tabelle = []
+    # Estrai tutte le tabelle dal documento
 
-# Lista per le righe da inserire nel DataFrame
-for i, tabella in enumerate(tabelle):
-    print(f"Tabella {i+1}:")
-    dipartimento = ""
+    for table in doc.tables:
+        tabella = []
+        for row in table.rows:
+            row = [cell.text.strip() for cell in row.cells]
+            tabella.append(row)
+        tabelle.append(tabella)
 
-    for row in tabella:
-        # Se una cella contiene la parola "DIPARTIMENTO", aggiorna il nome del dipartimento
-        if any(re.search(r"\bDIPARTIMENTO\b", cell, re.IGNORECASE) for cell in row):
-            dipartimento = " ".join(row).replace("DIPARTIMENTO", "").strip()
-            dipartimento = "DIPARTIMENTO" + dipartimento 
-            continue 
+    # Lista per le righe da inserire nel DataFrame
+    rows = []
+
+    # Lista per le righe da inserire nel DataFrame
+    for i, tabella in enumerate(tabelle):
+        log(f"Tabella {i+1}:")
+        dipartimento = ""
+
+        for row in tabella:
+            # Se una cella contiene la parola "DIPARTIMENTO", aggiorna il nome del dipartimento
+            if any(re.search(r"\bDIPARTIMENTO\b", cell, re.IGNORECASE) for cell in row):
+                dipartimento = " ".join(row).replace("DIPARTIMENTO", "").strip()
+                dipartimento = "DIPARTIMENTO" + dipartimento 
+                continue 
         
-        # Se una cella contiene "CODICE U-GOV", ignorala
-        if any(re.search(r"\bCODICE U-GOV\b", cell, re.IGNORECASE) for cell in row):
-            continue
+            # Se una cella contiene "CODICE U-GOV", ignorala
+            if any(re.search(r"\bCODICE U-GOV\b", cell, re.IGNORECASE) for cell in row):
+                continue
 
-        all_empty = True
-        for cell in row:
-            if cell.strip():
-                all_empty = False
-                break
-        if all_empty:
-            continue
+            all_empty = True
+            for cell in row:
+                if cell.strip():
+                    all_empty = False
+                    break
+            if all_empty:
+                continue
         
-        # Controlla che la riga abbia almeno 6 colonne
-        if len(row) >= 6:
-            rows.append({
-                "CORSO DI STUDIO": row[0],
-                "CORSO DI STUDIO": row[1],
-                "CODICE U-GOV": row[2],
-                "CLASSE": row[3],
-                "PRESIDENTE": row[4],
-                "NOTE": row[5],
-                "DOCENZA DI RIFERIMENTO": row[6],
-                "DIPARTIMENTO": dipartimento
-            })
-        else:
-            print(f"Riga ignorata per lunghezza insufficiente: {row}")
-        print(row)
-    print()
+            # Controlla che la riga abbia almeno 6 colonne
+            if len(row) >= 6:
+                rows.append({
+                    "CORSO DI STUDIO": row[0],
+                    "CORSO DI STUDIO": row[1],
+                    "CODICE U-GOV": row[2],
+                    "CLASSE": row[3],
+                    "PRESIDENTE": row[4],
+                    "NOTE": row[5],
+                    "DOCENZA DI RIFERIMENTO": row[6],
+                    "DIPARTIMENTO": dipartimento
+                })
+            else:
+                log(f"Riga ignorata per lunghezza insufficiente: {row}")
+            log(row)
+        log()
 
-# Crea il DataFrame e rimuove eventuali colonne duplicate
-df = pd.DataFrame(rows, columns=["CORSO DI STUDIO","CORSO DI STUDIO", "CODICE U-GOV", "CLASSE", "PRESIDENTE", "NOTE", "DOCENZA DI RIFERIMENTO", "DIPARTIMENTO"])
-df = df.loc[:, ~df.columns.duplicated()]
+    # Crea il DataFrame e rimuove eventuali colonne duplicate
+    df = pd.DataFrame(rows, columns=["CORSO DI STUDIO","CORSO DI STUDIO", "CODICE U-GOV", "CLASSE", "PRESIDENTE", "NOTE", "DOCENZA DI RIFERIMENTO", "DIPARTIMENTO"])
+    df = df.loc[:, ~df.columns.duplicated()]
+    return df
 
-# Salva il DataFrame in un file Excel
-df.to_excel("dataset/elenco_2024-2025.xlsx", index=False)
-print("File Excel salvato con successo!")
+if __name__ == "__main__":
+    df = estrai_elenco(file_path)
+    # Salva il DataFrame in un file Excel
+    df.to_excel(output_path, index=False)
+    print("File Excel salvato con successo!")
@@ -1,124 +1,312 @@
+import os
 import re
-from collections import defaultdict
+import sys
+import time
 import argparse
 import pandas as pd
 import json
+from datetime import datetime
 
 DEV = False
 # Parsing arguments
 parser = argparse.ArgumentParser(description="Estrai l'ultima risposta da un file Clingo e genera una struttura dati.")
-parser.add_argument("filepath", type=str, help="Percorso del file da analizzare.")
+parser.add_argument("filepath", type=str, nargs="?", default="-",
+                    help="Percorso del file da analizzare. Se omesso o '-', l'output di clingo viene letto da stdin.")
+parser.add_argument("--live", action="store_true",
+                    help="Aggiorna i file Excel e il file di avanzamento a ogni nuova risposta, mentre clingo è in esecuzione")
+parser.add_argument("--attesa", type=float, default=60,
+                    help="Con --live, secondi di attesa della creazione (o della rotazione) del file di log prima di terminare (default: 60)")
 args = parser.parse_args()
 
-garanti = defaultdict(list)
+regex_garante = re.compile(r"garante\((\d+),(\d+),\d+,(\w+)\)")
 
-try:
-    with open(args.filepath, "r") as file:
-        content = file.read()
-except FileNotFoundError:
-    print(f"Errore: Il file '{args.filepath}' non esiste.")
-    exit(1)
+# Riga con l'esito finale di clingo: dopo di essa non arrivano altre risposte
+regex_esito = re.compile(r"^(OPTIMUM FOUND|SATISFIABLE|UNSATISFIABLE|UNKNOWN)\s*$")
 
-print("Loading file...")
-answerBlocks = re.findall(r"(Answer: \d+\n.*?Optimization: -?\d+)", content, re.DOTALL)
+path_coperture = "../dataset/coperture.xlsx"
+path_docenti = "../dataset/docenti.xlsx"
 
-print("Processing...")
-if answerBlocks:
-    last_block = answerBlocks[-1]
-    matches = re.findall(r"garante\((\d+),(\d+),\d+,(\w+)\)", last_block)
+excel_output_path = "garanti.xlsx"
+jolly_output_path = "contratti.xlsx"
+progresso_output_path = "progresso.json"
 
-    for matricola_docente, codice_corso, quarto_elemento in matches:
-        if (matricola_docente, codice_corso, quarto_elemento) not in garanti[codice_corso]:
-            garanti[codice_corso].append((matricola_docente, quarto_elemento))
+def risposte(righe):
+    """
+    Legge l'output di clingo riga per riga e restituisce, man mano, le risposte complete,
+    cioè i blocchi "Answer: N" seguiti dalla loro riga "Optimization: ...".
+    In memoria vengono mantenuti solo gli atomi della risposta corrente.
 
+    :param righe: Iterabile di righe dell'output di clingo (file o stdin).
+    :type righe: iterable
+    :return: Generatore di coppie (lista di tuple (matricola, codice corso, tipo), vettore di ottimizzazione).
+    :rtype: generator
+    """
+    corrente = None
+    for riga in righe:
+        if riga.startswith("Answer:"):
+            corrente = list()
+        elif corrente is not None:
+            if riga.startswith("Optimization:"):
+                yield (corrente, [int(valore) for valore in riga.split()[1:]])
+                corrente = None
+            else:
+                corrente.extend(regex_garante.findall(riga))
 
-path_coperture = "../dataset/coperture.xlsx"
-path_docenti = "../dataset/docenti.xlsx"
+def ultima_risposta(righe):
+    """
+    Restituisce l'ultima risposta completa dell'output di clingo (vedi `risposte`),
+    quindi l'occupazione di memoria non dipende dalla dimensione del log.
 
+    :param righe: Iterabile di righe dell'output di clingo (file o stdin).
+    :type righe: iterable
+    :return: Coppia (lista di tuple (matricola, codice corso, tipo), vettore di ottimizzazione),
+             oppure None se il log non contiene risposte complete.
+    :rtype: tuple
+    """
+    ultima = None
+    for risposta in risposte(righe):
+        ultima = risposta
+    return ultima
 
+def carica_tabelle():
+    """
+    Carica le tabelle di lookup con una sola riga per matricola e per codice corso.
 
-df_docenti = pd.read_excel(path_docenti, engine="openpyxl", dtype=str)
-df_docenti = df_docenti[["Matricola", "Cognome e Nome"]]
-df_docenti["Matricola"] = df_docenti["Matricola"].astype(int)
-df_docenti["Matricola"] = df_docenti["Matricola"].astype(str)
-
-df_coperture = pd.read_excel(path_coperture, engine="openpyxl", dtype=str)
-df_coperture = df_coperture[["Cod. Corso di Studio", "Des. Corso di Studio"]]
-df_coperture["Cod. Corso di Studio"] = df_coperture["Cod. Corso di Studio"].astype(int)
-df_coperture["Cod. Corso di Studio"] = df_coperture["Cod. Corso di Studio"].astype(str)
-
-result = []
-jolly_data = []
-
-for codice_corso, docenti in garanti.items():
-    nome_corso = df_coperture.loc[
-        df_coperture["Cod. Corso di Studio"] == codice_corso, 
-        "Des. Corso di Studio"
-    ].values
-    
-    
-    matricole = [int(docente[0]) for docente in docenti if docente[1] != "c"]
-    nome_docenti = df_docenti.loc[
-        df_docenti["Matricola"].isin(map(str, matricole)), 
-        "Cognome e Nome"
-    ].tolist()
-    
-    num_jolly = len(docenti) - len(matricole)
-    
-    result.append({
-        "Codice corso": codice_corso,
-        "Matricole": matricole,
-        "Nome docenti": nome_docenti,
-        "Nome corso": nome_corso[0] if len(nome_corso) > 0 else "Non trovato",
-        "Jolly": "No" if num_jolly == 0 else "Si"
-    })
-    
-    jolly_data.append({
-        "Codice Corso": codice_corso,
-        "Des. Corso": nome_corso[0] if len(nome_corso) > 0 else "Non trovato",
-        "Numero di Jolly": num_jolly
-    })
-
-
-if DEV:
-    output_path = "result.json"
-    with open(output_path, "w", encoding="utf-8") as json_file:
-        json.dump(result, json_file, ensure_ascii=False, indent=4)
-    print(f"JSON salvato in '{output_path}'.")
-
-
-print("Salvataggio in Excel...")
-excel_data = []
-
-
-for entry in result:
-    codice_corso = entry["Codice corso"]
-    nome_corso = entry["Nome corso"]
-    for matricola, nome_docente in zip(entry["Matricole"], entry["Nome docenti"]):
-        excel_data.append({
-            "Cognome e Nome": nome_docente,
-            "Matricole": str(matricola),
-            "Codice Corso": str(codice_corso),
-            "Des. Corso": nome_corso
-        })
+    :return: Coppia (docenti, coperture) di DataFrame.
+    :rtype: tuple
+    """
+    df_docenti = pd.read_excel(path_docenti, engine="openpyxl", dtype=str, usecols=["Matricola", "Cognome e Nome"])
+    df_docenti["Matricola"] = df_docenti["Matricola"].astype(int).astype(str)
+    df_docenti = df_docenti.drop_duplicates(subset="Matricola").rename(columns={"Matricola": "Matricole"})
 
+    df_coperture = pd.read_excel(path_coperture, engine="openpyxl", dtype=str, usecols=["Cod. Corso di Studio", "Des. Corso di Studio"])
+    df_coperture["Cod. Corso di Studio"] = df_coperture["Cod. Corso di Studio"].astype(int).astype(str)
+    df_coperture = df_coperture.drop_duplicates(subset="Cod. Corso di Studio").rename(
+        columns={"Cod. Corso di Studio": "Codice Corso", "Des. Corso di Studio": "Des. Corso"}
+    )
+    return df_docenti, df_coperture
 
-excel_output_path = "garanti.xlsx"
-jolly_output_path = "contratti.xlsx"
+def salva_atomico(scrivi, path):
+    """
+    Scrive un file tramite un file temporaneo rinominato al termine, così chi legge il file
+    (o un'esecuzione interrotta) trova sempre la versione precedente o quella nuova completa.
+
+    :param scrivi: Funzione che scrive il contenuto nel percorso ricevuto come argomento.
+    :type scrivi: callable
+    :param path: Percorso del file da scrivere.
+    :type path: str
+    """
+    # Il temporaneo mantiene l'estensione, usata da pandas per scegliere il formato
+    radice, estensione = os.path.splitext(path)
+    tmp_path = f"{radice}.{os.getpid()}.tmp{estensione}"
+    scrivi(tmp_path)
+    os.replace(tmp_path, path)
+
+def scrivi_json(dati, path):
+    """
+    Scrive i dati indicati in formato JSON.
+    """
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(dati, json_file, ensure_ascii=False, indent=4)
+
+def scrivi_risultati(risposta, df_docenti, df_coperture, verbose=True):
+    """
+    Genera `garanti.xlsx` e, se ci sono docenti a contratto, `contratti.xlsx` a partire da una risposta.
+
+    :param risposta: Coppia (garanti, vettore di ottimizzazione) restituita da `risposte`, oppure None.
+    :type risposta: tuple
+    :param df_docenti: Tabella dei docenti restituita da `carica_tabelle`.
+    :type df_docenti: pandas.DataFrame
+    :param df_coperture: Tabella dei corsi restituita da `carica_tabelle`.
+    :type df_coperture: pandas.DataFrame
+    :param verbose: Se True, stampa i messaggi di avanzamento.
+    :type verbose: bool
+    """
+    log = print if verbose else (lambda *_: None)
+
+    garanti = pd.DataFrame(columns=["Matricole", "Codice Corso", "Tipo"])
+    if risposta:
+        matches, optimization = risposta
+        log(f"Optimization: {' '.join(map(str, optimization))}")
+
+        # Garanti raggruppati per corso, nell'ordine in cui i corsi compaiono nella risposta
+        garanti = pd.DataFrame(matches, columns=["Matricole", "Codice Corso", "Tipo"]).drop_duplicates()
+        garanti = garanti.sort_values("Codice Corso", key=lambda codici: pd.Series(pd.factorize(codici)[0]), kind="stable")
+
+    # Un unico join per arricchire tutti i garanti: ogni nome resta associato alla propria matricola
+    garanti = garanti.merge(df_coperture, how="left", on="Codice Corso")
+    garanti["Des. Corso"] = garanti["Des. Corso"].fillna("Non trovato")
+
+    jolly = garanti["Tipo"] == "c"
+    df_excel = garanti[~jolly].merge(df_docenti, how="left", on="Matricole")
+    df_excel["Cognome e Nome"] = df_excel["Cognome e Nome"].fillna("Non trovato")
 
-df_excel = pd.DataFrame(excel_data, columns=["Cognome e Nome", "Matricole", "Codice Corso", "Des. Corso"])
-df_excel["Matricole"] = df_excel["Matricole"].astype(str)
-df_excel["Codice Corso"] = df_excel["Codice Corso"].astype(str)
+    df_jolly = garanti.assign(**{"Numero di Jolly": jolly}).groupby(["Codice Corso", "Des. Corso"], sort=False, as_index=False)["Numero di Jolly"].sum()
 
-df_excel.to_excel(excel_output_path, index=False, engine="openpyxl")
-print(f"File Excel salvato in '{excel_output_path}'.")
 
-df_jolly = pd.DataFrame(jolly_data, columns=["Codice Corso", "Des. Corso", "Numero di Jolly"])
-df_jolly = df_jolly[df_jolly["Numero di Jolly"] > 0]
+    if DEV:
+        result = [
+            {
+                "Codice corso": codice_corso,
+                "Matricole": [int(matricola) for matricola in gruppo.loc[gruppo["Tipo"] != "c", "Matricole"]],
+                "Nome docenti": df_excel.loc[df_excel["Codice Corso"] == codice_corso, "Cognome e Nome"].tolist(),
+                "Nome corso": gruppo["Des. Corso"].iloc[0],
+                "Jolly": "Si" if (gruppo["Tipo"] == "c").any() else "No"
+            }
+            for codice_corso, gruppo in garanti.groupby("Codice Corso", sort=False)
+        ]
+        output_path = "result.json"
+        with open(output_path, "w", encoding="utf-8") as json_file:
+            json.dump(result, json_file, ensure_ascii=False, indent=4)
+        log(f"JSON salvato in '{output_path}'.")
 
-if not df_jolly.empty:
-    df_jolly = df_jolly.rename(columns={"Numero di Jolly": "Numero di Contratti"})
-    df_jolly.to_excel(jolly_output_path, index=False, engine="openpyxl")
-    print(f"File Excel con i contratti salvato in '{jolly_output_path}'.")
-else:
-    print("Nessun corso con contratti trovato, file non creato.")
\ No newline at end of file
+
+    log("Salvataggio in Excel...")
+
+    df_excel = df_excel[["Cognome e Nome", "Matricole", "Codice Corso", "Des. Corso"]]
+    salva_atomico(lambda path: df_excel.to_excel(path, index=False, engine="openpyxl"), excel_output_path)
+    log(f"File Excel salvato in '{excel_output_path}'.")
+
+    df_jolly = df_jolly[df_jolly["Numero di Jolly"] > 0]
+
+    if not df_jolly.empty:
+        df_jolly = df_jolly.rename(columns={"Numero di Jolly": "Numero di Contratti"})
+        salva_atomico(lambda path: df_jolly.to_excel(path, index=False, engine="openpyxl"), jolly_output_path)
+        log(f"File Excel con i contratti salvato in '{jolly_output_path}'.")
+    else:
+        # Un file di una risposta precedente non corrisponderebbe più a garanti.xlsx
+        if os.path.exists(jolly_output_path):
+            os.remove(jolly_output_path)
+        log("Nessun corso con contratti trovato, file non creato.")
+
+def segui_file(path, attesa=60, intervallo=0.5):
+    """
+    Legge un file di log mentre clingo lo scrive (come `tail -F`), restituendo le righe complete.
+
+    Se il file non esiste ancora ne attende la creazione; se viene ruotato (sostituito o troncato)
+    la lettura riprende dall'inizio del nuovo file. La lettura termina alla riga con l'esito finale
+    di clingo (es. "OPTIMUM FOUND").
+
+    :param path: Percorso del file di log.
+    :type path: str
+    :param attesa: Secondi di attesa massimi mentre il file non esiste. Default: 60.
+    :type attesa: float
+    :param intervallo: Secondi tra due controlli del file, quando non ci sono nuove righe. Default: 0.5.
+    :type intervallo: float
+    :return: Generatore delle righe del file.
+    :rtype: generator
+    :raises FileNotFoundError: Se il file non esiste per più di `attesa` secondi.
+    """
+    file = None
+    parziale = ""
+    assente_da = None
+    try:
+        while True:
+            if file is None:
+                try:
+                    file = open(path, "r")
+                    assente_da = None
+                except FileNotFoundError:
+                    if assente_da is None:
+                        assente_da = time.monotonic()
+                        print(f"In attesa del file '{path}'...", flush=True)
+                    elif time.monotonic() - assente_da > attesa:
+                        raise
+                    time.sleep(intervallo)
+                    continue
+
+            riga = file.readline()
+            if riga.endswith("\n"):
+                riga, parziale = parziale + riga, ""
+                yield riga
+                if regex_esito.match(riga):
+                    return
+                continue
+
+            # Fine del file: l'ultima riga può essere ancora incompleta
+            parziale += riga
+            try:
+                stat = os.stat(path)
+                ruotato = stat.st_ino != os.fstat(file.fileno()).st_ino or stat.st_size < file.tell()
+            except FileNotFoundError:
+                ruotato = True
+            if ruotato:
+                file.close()
+                file, parziale = None, ""
+            else:
+                time.sleep(intervallo)
+    finally:
+        if file is not None:
+            file.close()
+
+def segui(righe, df_docenti, df_coperture):
+    """
+    Modalità live: a ogni risposta completa rigenera i file Excel e aggiorna `progresso.json`
+    con il costo corrente e la sua evoluzione. Se l'esecuzione di clingo viene interrotta o
+    raggiunge il limite di tempo, sul disco resta sempre la migliore risposta trovata.
+
+    :param righe: Iterabile di righe dell'output di clingo, letto mentre viene prodotto.
+    :type righe: iterable
+    :param df_docenti: Tabella dei docenti restituita da `carica_tabelle`.
+    :type df_docenti: pandas.DataFrame
+    :param df_coperture: Tabella dei corsi restituita da `carica_tabelle`.
+    :type df_coperture: pandas.DataFrame
+    :return: L'ultima risposta ricevuta, oppure None.
+    :rtype: tuple
+    """
+    inizio = time.monotonic()
+    storia = list()
+    ultima = None
+    for risposta in risposte(righe):
+        ultima = risposta
+        scrivi_risultati(risposta, df_docenti, df_coperture, verbose=False)
+
+        costo = risposta[1]
+        storia.append({"modello": len(storia) + 1, "secondi": round(time.monotonic() - inizio, 3), "costo": costo})
+        progresso = {
+            "aggiornato": datetime.now().isoformat(timespec="seconds"),
+            "modelli": len(storia),
+            "costo": costo,
+            "miglioramento": [precedente - attuale for precedente, attuale in zip(storia[0]["costo"], costo)],
+            "storia": storia
+        }
+        salva_atomico(lambda path: scrivi_json(progresso, path), progresso_output_path)
+        print(f"Modello {len(storia)} ({storia[-1]['secondi']:.1f}s): Optimization: {' '.join(map(str, costo))}", flush=True)
+    return ultima
+
+if args.live:
+    df_docenti, df_coperture = carica_tabelle()
+    print("Lettura dell'output di clingo in corso...", flush=True)
+    try:
+        if args.filepath == "-":
+            ultima = segui(sys.stdin, df_docenti, df_coperture)
+        else:
+            ultima = segui(segui_file(args.filepath, attesa=args.attesa), df_docenti, df_coperture)
+        if ultima is None:
+            scrivi_risultati(None, df_docenti, df_coperture)
+    except KeyboardInterrupt:
+        # I file contengono già l'ultima risposta ricevuta, scritta in modo atomico
+        print("Interrotto.")
+    except FileNotFoundError:
+        print(f"Errore: Il file '{args.filepath}' non esiste.")
+        exit(1)
+    except OSError as e:
+        print(f"Errore: impossibile leggere il file '{args.filepath}'. {e}")
+        exit(1)
+    print(f"Risultati aggiornati in '{excel_output_path}' e '{progresso_output_path}'.")
+    exit(0)
+
+print("Loading file...")
+try:
+    if args.filepath == "-":
+        risposta = ultima_risposta(sys.stdin)
+    else:
+        with open(args.filepath, "r") as file:
+            risposta = ultima_risposta(file)
+except FileNotFoundError:
+    print(f"Errore: Il file '{args.filepath}' non esiste.")
+    exit(1)
+
+print("Processing...")
+df_docenti, df_coperture = carica_tabelle()
+scrivi_risultati(risposta, df_docenti, df_coperture)
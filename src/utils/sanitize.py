@@ -1,11 +1,18 @@
 # %%
 import pandas as pd
 import openpyxl
-import re
+import argparse
+import hashlib
+import importlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 path_ns_coperture = "../dataset/originali/coperture.xlsx"
 path_ns_docenti = "../dataset/originali/docenti.xlsx"
 path_ns_elenco_24_25 = "../dataset/originali/elenco_2024-2025.xlsx"
+path_ns_elenco_docx = "../dataset/originali/elenco_2024-2025.docx"
+path_ns_allegato_d = "../dataset/allegato-d.ods"
 
 path_coperture = "../dataset/coperture.xlsx"
 path_docenti = "../dataset/docenti.xlsx"
@@ -15,38 +22,41 @@ path_elenco_24_25 = "../dataset/elenco_2024-2025.xlsx"
 path_allegato_d = "../dataset/allegato-d-sanitized.xlsx"
 path_elenco_allegato = "../dataset/elenco_allegato.xlsx"
 
-def aggiorna_cod_tipo_corso(row, df_allegato):
+# Impronte degli input di ogni passo all'ultima esecuzione (vedi `sanitize`)
+path_stato = "../dataset/.cache/sanitize.json"
+
+def aggiorna_cod_tipo_corso(df, df_allegato):
     """
-    Aggiorna il codice del tipo di corso in base alla descrizione del corso.
+    Aggiorna il codice del tipo di corso in base all'elenco dei corsi con l'allegato D.
 
-    La funzione esamina la descrizione del corso e, se corrisponde ad alcune parole chiave specifiche, 
-    aggiorna il codice tipo corso (ad esempio 'LT' o 'LM').
+    I corsi a ciclo unico ('LM5', 'LM6') mantengono il proprio tipo; per gli altri corsi, se il
+    "Cod. Corso di Studio" compare nella colonna "CODICE U-GOV" dell'elenco, viene usato il
+    "Cod. Tipo laurea" della prima riga corrispondente che ne indica uno; i corsi senza un tipo
+    nell'elenco mantengono il proprio. Il risultato è sempre in maiuscolo.
 
-    :param row: Una riga del DataFrame contenente le informazioni del corso.
-    :type row: pandas.Series
-    :return: Il codice tipo corso aggiornato.
-    :rtype: str
-    :raises ValueError: Se la descrizione del corso non corrisponde a nessuna delle regole mappate.
+    La ricerca avviene con un'unica mappatura codice -> tipo su tutte le righe, invece di
+    filtrare l'elenco per ogni riga delle coperture.
+
+    :param df: DataFrame contenente le informazioni dei corsi.
+    :type df: pandas.DataFrame
+    :param df_allegato: DataFrame dell'elenco dei corsi con l'allegato D (`path_elenco_allegato`).
+    :type df_allegato: pandas.DataFrame
+    :return: Serie con il codice tipo corso aggiornato per ogni riga.
+    :rtype: pandas.Series
     """
-    # print(df_allegato.columns.tolist())
-    # print(row)
-    codice_corso_studio = row["Cod. Corso di Studio"]
-    tipo_corso = row['Cod. Tipo Corso']
-    
-    tipo_corso = tipo_corso.lower()
-    if tipo_corso in ["lm6", "lm5"]:
-        return tipo_corso.upper()
+    tipo_corso = df["Cod. Tipo Corso"].str.lower()
 
-    filtro = df_allegato["CODICE U-GOV"] == codice_corso_studio
-    corrispondenza = df_allegato[filtro]
-    
-    if not corrispondenza.empty:
-        # Se c'è corrispondenza, prendi il valore di "Cod. Tipo laurea"
-        nuovo_tipo_corso = corrispondenza.iloc[0]["Cod. Tipo laurea"]
-        return nuovo_tipo_corso.upper()
-    return tipo_corso.upper()
+    # Prima riga dell'elenco con un tipo per ogni codice: un tipo mancante (es. corso 3062, classe
+    # l-sc.mat) non deve sostituire quello delle coperture
+    mappa = df_allegato.dropna(subset=["CODICE U-GOV", "Cod. Tipo laurea"]).drop_duplicates(subset="CODICE U-GOV")
+    mappa = mappa.set_index("CODICE U-GOV")["Cod. Tipo laurea"]
+
+    codici = df["Cod. Corso di Studio"]
+    nuovo_tipo_corso = tipo_corso.where(~codici.isin(mappa.index), codici.map(mappa))
+    nuovo_tipo_corso = nuovo_tipo_corso.where(~tipo_corso.isin(["lm6", "lm5"]), tipo_corso)
+    return nuovo_tipo_corso.str.upper()
 
-def sanitize_codici_corso(df):
+def sanitize_codici_corso(df, df_elenco_allegato):
     """
     Sanifica i codici dei corsi in base alla descrizione e al tipo del corso.
 
@@ -55,14 +65,15 @@ def sanitize_codici_corso(df):
 
     :param df: DataFrame contenente le informazioni dei corsi.
     :type df: pandas.DataFrame
+    :param df_elenco_allegato: Elenco dei corsi con l'allegato D (vedi `merge_elenco_allegato`).
+    :type df_elenco_allegato: pandas.DataFrame
     :return: DataFrame con i codici tipo corso aggiornati.
     :rtype: pandas.DataFrame
     """
     
     # Sostituzione l con lt
 
-    df_allegato = pd.read_excel(path_elenco_allegato, engine="openpyxl", dtype=str)
-    df["Cod. Tipo Corso"] = df.apply(lambda row: aggiorna_cod_tipo_corso(row, df_allegato), axis=1)
+    df["Cod. Tipo Corso"] = aggiorna_cod_tipo_corso(df, df_elenco_allegato)
     df.loc[df["Cod. Tipo Corso"].str.lower() == "l", "Cod. Tipo Corso"] = "LT"
     
     
@@ -70,153 +81,135 @@ def sanitize_codici_corso(df):
 
 
 # %%
-def sanitize_coperture():
+def prepara_coperture(df_coperture, df_elenco_allegato):
     """
-    Sanifica i dati di copertura, rimuovendo le righe con matricola vuota e 
-    mantenendo solo i record con matricole esistenti nel file dei docenti.
+    Prepara le coperture comuni a `sanitize_coperture` e `compute_extra_data`.
 
     La funzione esegue le seguenti operazioni:
-    1. Carica i dati dal file `path_ns_coperture`.
-    2. Rimuove le righe in cui il campo "Matricola" è vuoto.
-    3. Converte la "Matricola" in formato stringa.
-    4. Filtra i dati mantenendo solo le matricole esistenti nel file dei docenti.
-    5. Sanifica il campo "Cod. Tipo Corso" tramite la funzione `sanitize_codici_corso`.
-    6. Salva i dati sanificati nel file `path_coperture`.
-
-    :return: Nessuno. I dati sanificati vengono salvati nel file di output.
-    :rtype: None
-    """
-    df = pd.read_excel(path_ns_coperture, engine="openpyxl", dtype=str)
-    # print(df)
+    1. Rimuove le righe in cui il campo "Matricola" è vuoto.
+    2. Converte la "Matricola" in formato stringa.
+    3. Sanifica il campo "Cod. Tipo Corso" tramite la funzione `sanitize_codici_corso`.
+
+    :param df_coperture: Coperture originali (`path_ns_coperture`).
+    :type df_coperture: pandas.DataFrame
+    :param df_elenco_allegato: Elenco dei corsi con l'allegato D (vedi `merge_elenco_allegato`).
+    :type df_elenco_allegato: pandas.DataFrame
+    :return: Coperture con matricola e codici tipo corso sanificati.
+    :rtype: pandas.DataFrame
+    """
     # Rimuovere le righe che hanno il campo matricola vuoto
-    df = df.dropna(subset=["Matricola"])
-    # print(df)
+    df = df_coperture.dropna(subset=["Matricola"]).copy()
     df["Matricola"] = df["Matricola"].astype(int)
-    # print(df)
     df["Matricola"] = df["Matricola"].astype(str)
-    # astype
-    matricole = pd.read_excel(path_docenti, engine="openpyxl", dtype=str)["Matricola"]
-    # print(matricole)
-    df = df[df["Matricola"].isin(matricole)]
-    df = sanitize_codici_corso(df)
-    
-    df.to_excel(path_coperture, index=False)
+    return sanitize_codici_corso(df, df_elenco_allegato)
+
+def sanitize_coperture(df_coperture, matricole):
+    """
+    Sanifica i dati di copertura, mantenendo solo i record con matricole esistenti nel file dei docenti.
+
+    :param df_coperture: Coperture preparate da `prepara_coperture`.
+    :type df_coperture: pandas.DataFrame
+    :param matricole: Insieme delle matricole dei docenti (vedi `sanitize_docenti`).
+    :type matricole: set
+    :return: Coperture dei docenti, da salvare in `path_coperture`.
+    :rtype: pandas.DataFrame
+    """
+    return df_coperture[df_coperture["Matricola"].isin(matricole)]
 
 
 # %%
-def sanitize_docenti():
+def sanitize_docenti(df):
     """
-    Sanifica i dati dei docenti, rimuovendo eventuali caratteri non numerici dalle matricole 
-    e salvando i risultati nel file di output.
+    Sanifica i dati dei docenti, rimuovendo eventuali caratteri non numerici dalle matricole.
 
-    La funzione rimuove i caratteri `.` e `,` dalle matricole e converte il campo in formato stringa 
-    prima di salvare il DataFrame nel file Excel `path_docenti`.
+    La funzione rimuove i caratteri `.` e `,` dalle matricole e converte il campo in formato stringa.
 
-    :return: Nessuno. I dati dei docenti sanificati vengono salvati nel file di output.
-    :rtype: None
+    :param df: Docenti originali (`path_ns_docenti`).
+    :type df: pandas.DataFrame
+    :return: Docenti sanificati, da salvare in `path_docenti`.
+    :rtype: pandas.DataFrame
     """
-    df = pd.read_excel(path_ns_docenti, engine="openpyxl", dtype=str)
+    df = df.copy()
     # rimozioni .
     df["Matricola"] = df["Matricola"].str.replace(".", "")
     # rimozioni ,
     df["Matricola"] = df["Matricola"].str.replace(",", "")
     
-    # print(df)
     df["Matricola"] = df["Matricola"].astype(int)
     df["Matricola"] = df["Matricola"].astype(str)
-    # salvataggio
-    df.to_excel(path_docenti, index=False)
+    return df
     
     
 # %%    
-def compute_extra_data():
+def compute_extra_data(df_coperture, matricole):
+    """
+    Calcola i dati extra per i corsi senza docenti, cioè i record con matricole che non
+    esistono nel file dei docenti (docenti a contratto).
+
+    :param df_coperture: Coperture preparate da `prepara_coperture`.
+    :type df_coperture: pandas.DataFrame
+    :param matricole: Insieme delle matricole dei docenti (vedi `sanitize_docenti`).
+    :type matricole: set
+    :return: Coperture a contratto, da salvare in `path_coperture_contratti`.
+    :rtype: pandas.DataFrame
     """
-    Calcola i dati extra per i corsi senza docenti e li salva nel file di output.
-
-    La funzione esegue le seguenti operazioni:
-    1. Carica i dati dal file `path_ns_coperture`.
-    2. Rimuove le righe in cui il campo "Matricola" è vuoto.
-    3. Converte la "Matricola" in formato stringa.
-    4. Filtra i dati mantenendo solo i record con matricole che non esistono nel file dei docenti.
-    5. Sanifica il campo "Cod. Tipo Corso" tramite la funzione `sanitize_codici_corso`.
-    6. Salva i dati nel file `path_coperture_contratti`.
-
-    :return: Nessuno. I dati vengono salvati nel file di output.
-    :rtype: None
-    """
-    df = pd.read_excel(path_ns_coperture, engine="openpyxl", dtype=str)
-    # print(df)
-    # Rimuovere le righe che hanno il campo matricola vuoto
-    df = df.dropna(subset=["Matricola"])
-    # print(df)
-    df["Matricola"] = df["Matricola"].astype(int)
-    # print(df)
-    df["Matricola"] = df["Matricola"].astype(str)
-    # astype
-    matricole = pd.read_excel(path_docenti, engine="openpyxl", dtype=str)["Matricola"]
-    # print(matricole)
-    
     # Not isin
-    df = df[~df["Matricola"].isin(matricole)]
-    
-    df = sanitize_codici_corso(df)
-    
-    df.to_excel(path_coperture_contratti, index=False)
+    return df_coperture[~df_coperture["Matricola"].isin(matricole)]
     
 # %%%
-def compute_remained():
+def compute_remained(df_full, df_indeterminati, df_contratti):
     """
-    Calcola i corsi rimasti senza docente e li salva nel file di output.
-
-    La funzione esegue le seguenti operazioni:
-    1. Carica i dati completi dal file `path_ns_coperture`, quelli già assegnati ai docenti dal file `path_coperture`,
-       e quelli assegnati a contratti dal file `path_coperture_contratti`.
-    2. Esclude i corsi già assegnati a docenti (sia determinati che a contratto) dal set di corsi completi.
-    3. Rimuove le righe con valori vuoti in tutte le colonne.
-    4. Salva i corsi rimasti nel file `path_coperture_rimaste`.
-
-    :return: Nessuno. I dati dei corsi rimasti vengono salvati nel file di output.
-    :rtype: None
+    Calcola i corsi rimasti senza docente.
+
+    La funzione esclude dal set di corsi completi quelli già assegnati ai docenti (sia determinati che
+    a contratto) e rimuove le righe con valori vuoti in tutte le colonne.
+
+    :param df_full: Coperture originali (`path_ns_coperture`).
+    :type df_full: pandas.DataFrame
+    :param df_indeterminati: Coperture dei docenti (vedi `sanitize_coperture`).
+    :type df_indeterminati: pandas.DataFrame
+    :param df_contratti: Coperture a contratto (vedi `compute_extra_data`).
+    :type df_contratti: pandas.DataFrame
+    :return: Corsi rimasti, da salvare in `path_coperture_rimaste`.
+    :rtype: pandas.DataFrame
     """
-    df_full = pd.read_excel(path_ns_coperture, engine="openpyxl", dtype=str)
-    df_indeterminati = pd.read_excel(path_coperture, engine="openpyxl", dtype=str)
-    df_contratti = pd.read_excel(path_coperture_contratti, engine="openpyxl", dtype=str)
-
-    
     df_full = df_full[~df_full["Cod. Att. Form."].isin(df_indeterminati["Cod. Att. Form."])]
     df_full = df_full[~df_full["Cod. Att. Form."].isin(df_contratti["Cod. Att. Form."])]
 
-    df_full.dropna(how="all", inplace=True)
-    df_full.to_excel(path_coperture_rimaste, index=False)
+    return df_full.dropna(how="all")
     
 
 
-def sanitize_elenco_24_25():
-    df = pd.read_excel(path_ns_elenco_24_25, engine="openpyxl", dtype=str)
+def sanitize_elenco_24_25(df):
     # tiene solo le righe che hanno la colonna "NOTE" vuota
-    df = df[df["NOTE"].isna()]
-    df.to_excel(path_elenco_24_25, index=False)
-    print("Elenco 24-25 sanitizzato")
+    return df[df["NOTE"].isna()]
 
-def merge_elenco_allegato():
+def merge_elenco_allegato(df_elenco, df_allegato):
     # legge il contenuto della colonna classe di df_allegato e il contenuto della cella (in lower cases) è contenuto nella
     # colonna classe di df_elenco aggiunge alla riga di df_elenco il contenuto delle colonne Tipo laurea, N. di riferimento e
     # N. max a df_elenco
-    df_elenco = pd.read_excel(path_elenco_24_25, engine="openpyxl", dtype=str)
-    df_allegato = pd.read_excel(path_allegato_d, engine="openpyxl", dtype=str)
+    df_allegato = df_allegato.copy()
     
     df_elenco = df_elenco.drop(columns=["NOTE"])
     df_elenco["CLASSE"] = df_elenco["CLASSE"].str.lower()
     df_allegato["CLASSE"] = df_allegato["CLASSE"].str.lower()
     
-    for _, row in df_allegato.iterrows():
-        classe_allegato = row["CLASSE"]
-        mask = df_elenco["CLASSE"].str.contains(classe_allegato, na=False, regex=False)
-
-        df_elenco.loc[mask, "Cod. Tipo laurea"] = row.get("Tipo laurea", "")
-        # questi sono interi 
-        df_elenco.loc[mask, "N. di riferimento"] = row.get("N. di riferimento", "")
-        df_elenco.loc[mask, "N. max"] = row.get("N. max", "")
+    # Join sulle classi: per ogni classe distinta dell'elenco si cerca l'ultima riga dell'allegato la cui
+    # classe è contenuta nella descrizione (es. "lm-14 filologia moderna & lm-15 ..."). Il confronto
+    # avviene una sola volta per coppia di classi distinte, poi i valori vengono uniti con un merge.
+    classi_allegato = [(i, classe) for i, classe in enumerate(df_allegato["CLASSE"]) if isinstance(classe, str)]
+    corrispondenze = dict()
+    for classe in df_elenco["CLASSE"].dropna().unique():
+        indici = [i for i, classe_allegato in classi_allegato if classe_allegato in classe]
+        if indici:
+            corrispondenze[classe] = indici[-1]
+
+    colonne_allegato = {"Tipo laurea": "Cod. Tipo laurea", "N. di riferimento": "N. di riferimento", "N. max": "N. max"}
+    # questi sono interi 
+    valori = df_allegato.reindex(columns=list(colonne_allegato), fill_value="").rename(columns=colonne_allegato)
+    valori = valori.iloc[list(corrispondenze.values())]
+    valori.insert(0, "CLASSE", pd.Series(list(corrispondenze.keys()), index=valori.index, dtype=object))
+    df_elenco = df_elenco.merge(valori, how="left", on="CLASSE")
     
     # aggiorna df_elenco
     
@@ -227,53 +220,226 @@ def merge_elenco_allegato():
     # se nella colonna "DOCENZA DI RIFERIMENTO" sono presenti i numeri 3 - 1 imposta il contenuto della colonna Cod. Tipo Laurea = LCPC
     # deve essere fatto tramite regex perché il contenuto della cella è "5  DI CUI 3 PO/PA"
     
-    def codifica_tipo_laurea(docenza):
-        """Ritorna il codice Cod. Tipo Laurea in base al contenuto della colonna DOCENZA DI RIFERIMENTO."""
-        if pd.isna(docenza):
-            return None
-        docenza = str(docenza)
-        if re.search(r"\b5\b.*\b3\b", docenza):
-            # Laurea caso particolare A
-            return "LCPA"
-        elif re.search(r"\b4\b.*\b2\b", docenza):
-            # Laurea caso particolare B
-            return "LCPB"
-        elif re.search(r"\b3\b.*\b1\b", docenza):
-            # Laurea caso particolare C
-            return "LCPC"
-        return None
-    
-    df_elenco["Cod. Tipo laurea"] = df_elenco.apply(
-        lambda row: codifica_tipo_laurea(row["DOCENZA DI RIFERIMENTO"]) or row["Cod. Tipo laurea"], axis=1
-    )
+    docenza = df_elenco["DOCENZA DI RIFERIMENTO"]
+    casi_particolari = [
+        # Laurea caso particolare A
+        (r"\b5\b.*\b3\b", "LCPA"),
+        # Laurea caso particolare B
+        (r"\b4\b.*\b2\b", "LCPB"),
+        # Laurea caso particolare C
+        (r"\b3\b.*\b1\b", "LCPC"),
+    ]
+    # I casi vengono applicati dall'ultimo al primo, così a parità vale il primo che corrisponde
+    for regex, codice in reversed(casi_particolari):
+        df_elenco.loc[docenza.str.contains(regex, regex=True, na=False), "Cod. Tipo laurea"] = codice
     
-    df_elenco.to_excel(path_elenco_allegato, index=False)
-    print("Elenco-allegato 24-25 sanitizzato")
-    # return df_elenco
+    return df_elenco
 
 # %%
-def sanitize():
+def come_da_excel(df):
     """
-    Funzione principale per sanificare i dati.
+    Rende un DataFrame uguale a quello riletto dal file Excel in cui viene salvato:
+    le celle vuote diventano NaN (es. la colonna "NOTE" usata da `sanitize_elenco_24_25`).
+    """
+    return df.mask(df.eq(""))
+
+def converti_elenco(path_docx):
+    """
+    Estrae l'elenco dei corsi 24-25 dal documento Word (vedi `doc2xlsx.py`).
+    """
+    return come_da_excel(importlib.import_module("doc2xlsx").estrai_elenco(path_docx, verbose=False))
 
-    La funzione chiama tutte le operazioni di sanificazione:
-    - Sanifica i dati dei docenti.
-    - Sanifica i dati delle coperture.
-    - Calcola i dati extra per i corsi senza docenti.
-    - Calcola i corsi rimasti senza docente.
+def converti_allegato(path_ods):
+    """
+    Unisce i fogli dell'allegato D (vedi `sanitizer-allegato.py`).
+    """
+    return come_da_excel(importlib.import_module("sanitizer-allegato").sanitizza_allegato(path_ods))
 
-    :return: Nessuno. Vengono salvati i dati nei rispettivi file di output.
-    :rtype: None
+def coperture_e_contratti(df_ns_coperture, df_docenti, df_elenco_allegato):
+    """
+    Divide le coperture tra docenti e contratti: la preparazione delle coperture e
+    l'insieme delle matricole dei docenti vengono calcolati una sola volta.
+    """
+    matricole = set(df_docenti["Matricola"])
+    df_coperture = prepara_coperture(df_ns_coperture, df_elenco_allegato)
+    return sanitize_coperture(df_coperture, matricole), compute_extra_data(df_coperture, matricole)
+
+# Passi della sanificazione in ordine topologico: ogni passo riceve i DataFrame dei propri input
+# (i file non Excel vengono passati come percorso) e restituisce quelli dei propri output.
+PASSI = [
+    {"nome": "elenco", "input": [path_ns_elenco_docx], "output": [path_ns_elenco_24_25], "funzione": converti_elenco},
+    {"nome": "allegato", "input": [path_ns_allegato_d], "output": [path_allegato_d], "funzione": converti_allegato},
+    {"nome": "elenco_24_25", "input": [path_ns_elenco_24_25], "output": [path_elenco_24_25], "funzione": sanitize_elenco_24_25},
+    {"nome": "elenco_allegato", "input": [path_elenco_24_25, path_allegato_d], "output": [path_elenco_allegato],
+     "funzione": merge_elenco_allegato},
+    {"nome": "docenti", "input": [path_ns_docenti], "output": [path_docenti], "funzione": sanitize_docenti},
+    # Coperture e contratti hanno gli stessi input: un unico passo con due output, come una regola di make
+    {"nome": "coperture", "input": [path_ns_coperture, path_docenti, path_elenco_allegato],
+     "output": [path_coperture, path_coperture_contratti], "funzione": coperture_e_contratti},
+    {"nome": "rimaste", "input": [path_ns_coperture, path_coperture, path_coperture_contratti],
+     "output": [path_coperture_rimaste], "funzione": compute_remained}
+]
+
+def leggi_excel(path):
+    """
+    Legge un file Excel con tutte le colonne come stringhe.
     """
-    sanitize_elenco_24_25()
-    merge_elenco_allegato()
-    sanitize_docenti()
-    sanitize_coperture()
-    compute_extra_data()
-    compute_remained()
+    return pd.read_excel(path, engine="openpyxl", dtype=str)
+
+def scrivi_excel(df, path):
+    """
+    Salva un DataFrame in un file Excel.
+    """
+    df.to_excel(path, index=False)
+    return path
+
+def impronta(path):
+    """
+    Calcola l'hash SHA-256 del contenuto di un file.
+
+    :param path: Percorso del file.
+    :type path: str
+    :return: Hash esadecimale, oppure None se il file non esiste.
+    :rtype: str
+    """
+    if not os.path.exists(path):
+        return None
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blocco in iter(lambda: f.read(1 << 20), b""):
+            sha.update(blocco)
+    return sha.hexdigest()
+
+def leggi_stato():
+    """
+    Legge le impronte salvate dall'ultima esecuzione, restituendo un dizionario vuoto se il file non esiste o non è valido.
+    """
+    if not os.path.exists(path_stato):
+        return dict()
+    try:
+        with open(path_stato) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Attenzione: stato della sanificazione non valido, tutti i passi verranno valutati per data. {e}")
+        return dict()
+
+def salva_stato(stato):
+    """
+    Salva le impronte degli input dei passi tramite un file temporaneo rinominato al termine.
+    """
+    os.makedirs(os.path.dirname(path_stato), exist_ok=True)
+    tmp_path = f"{path_stato}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(stato, f, indent=4)
+    os.replace(tmp_path, path_stato)
+
+def da_eseguire(passo, stato, prodotti):
+    """
+    Stabilisce se un passo deve essere eseguito, come una regola di make.
+
+    Un passo viene eseguito se uno dei suoi input viene rigenerato da un passo precedente, se manca
+    uno dei suoi output oppure se l'hash di un input è diverso da quello salvato all'ultima esecuzione.
+    Se il passo non è mai stato eseguito vale la regola di make sulle date di modifica: gli output
+    esistenti più recenti di tutti gli input sono considerati aggiornati (es. un file corretto a mano).
+
+    :param passo: Passo da valutare (elemento di `PASSI`).
+    :type passo: dict
+    :param stato: Impronte salvate (vedi `leggi_stato`).
+    :type stato: dict
+    :param prodotti: Percorsi degli output dei passi già scelti per l'esecuzione.
+    :type prodotti: set
+    :return: Motivo dell'esecuzione, oppure None se il passo è aggiornato.
+    :rtype: str
+    """
+    rigenerati = [path for path in passo["input"] if path in prodotti]
+    if rigenerati:
+        return f"input rigenerato: {', '.join(rigenerati)}"
+    mancanti = [path for path in passo["output"] if not os.path.exists(path)]
+    if mancanti:
+        return f"output mancante: {', '.join(mancanti)}"
+    assenti = [path for path in passo["input"] if not os.path.exists(path)]
+    if assenti:
+        # Senza input gli output esistenti vengono mantenuti
+        print(f"Attenzione: passo '{passo['nome']}' senza input ({', '.join(assenti)}), uso gli output esistenti.")
+        return None
+
+    salvate = stato.get(passo["nome"])
+    if salvate is None:
+        if min(os.path.getmtime(path) for path in passo["output"]) < max(os.path.getmtime(path) for path in passo["input"]):
+            return "output meno recente degli input"
+        return None
+    modificati = [path for path in passo["input"] if salvate.get(path) != impronta(path)]
+    if modificati:
+        return f"input modificato: {', '.join(modificati)}"
+    return None
+
+def sanitize(forza=False, dry_run=False, workers=None):
+    """
+    Funzione principale per sanificare i dati.
+
+    I passi di `PASSI` formano un grafo delle dipendenze tra i file del dataset: vengono eseguiti solo
+    quelli con input modificati rispetto all'ultima esecuzione (vedi `da_eseguire`) e i passi che da essi
+    dipendono. Ogni file viene letto al più una volta (in parallelo) e i DataFrame vengono passati in
+    memoria tra i passi; al termine gli output vengono scritti in parallelo e vengono salvate le impronte
+    degli input dei passi eseguiti in `path_stato`.
+
+    :param forza: Se True, esegue tutti i passi.
+    :type forza: bool
+    :param dry_run: Se True, stampa i passi da eseguire senza eseguirli.
+    :type dry_run: bool
+    :param workers: Numero di processi usati per leggere e scrivere i file Excel. Default: numero di CPU.
+    :type workers: int
+    :return: Nomi dei passi eseguiti (o da eseguire, con `dry_run`).
+    :rtype: list
+    """
+    stato = dict() if forza else leggi_stato()
+    piano = list()
+    prodotti = set()
+    for passo in PASSI:
+        motivo = "esecuzione forzata" if forza else da_eseguire(passo, stato, prodotti)
+        if motivo is None:
+            if passo["nome"] not in stato and all(os.path.exists(path) for path in passo["input"]):
+                # Output aggiornati per data: da ora il passo viene valutato con le impronte
+                stato[passo["nome"]] = {path: impronta(path) for path in passo["input"]}
+            continue
+        print(f"{passo['nome']}: {motivo}")
+        piano.append(passo)
+        prodotti.update(passo["output"])
+
+    if dry_run:
+        return [passo["nome"] for passo in piano]
+    if not piano:
+        print("Dataset già aggiornato.")
+        salva_stato(stato)
+        return list()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Input Excel non prodotti dai passi in esecuzione, letti una sola volta
+        da_leggere = sorted({path for passo in piano for path in passo["input"]
+                             if path.endswith(".xlsx") and path not in prodotti})
+        frames = dict(zip(da_leggere, pool.map(leggi_excel, da_leggere)))
+
+        for passo in piano:
+            risultato = passo["funzione"](*[frames.get(path, path) for path in passo["input"]])
+            if len(passo["output"]) == 1:
+                risultato = (risultato,)
+            frames.update(zip(passo["output"], risultato))
+
+        output = [path for passo in piano for path in passo["output"]]
+        for path in pool.map(scrivi_excel, [frames[path] for path in output], output):
+            print(f"Salvato: {path}")
+
+    for passo in piano:
+        stato[passo["nome"]] = {path: impronta(path) for path in passo["input"]}
+    salva_stato(stato)
+    return [passo["nome"] for passo in piano]
 
 # %%
 if __name__ == "__main__":
-    sanitize()
+    parser = argparse.ArgumentParser(description="Sanifica il dataset rigenerando solo i file con input modificati")
+    parser.add_argument("-B", "--force", action="store_true", help="Esegue tutti i passi, anche se aggiornati")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="Stampa i passi da eseguire senza eseguirli")
+    args = parser.parse_args()
+    sanitize(forza=args.force, dry_run=args.dry_run)
     
-# %%
+# %%
\ No newline at end of file